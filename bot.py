@@ -1,3 +1,5 @@
+import startup_profiler  # 需最先导入，MADOKA_PROFILE_STARTUP=1 时统计启动耗时
+
 import nonebot
 from nonebot.adapters.onebot.v11 import Adapter as ONEBOT_V11_Adapter
 
@@ -6,17 +8,19 @@ nonebot.init()
 
 # 注册适配器
 driver = nonebot.get_driver()
+startup_profiler.watch_driver(driver)
 driver.register_adapter(ONEBOT_V11_Adapter)
 
 
 # 第三方插件
 nonebot.load_plugin("nonebot_plugin_alconna")
-nonebot.load_plugin("nonebot_plugin_datastore") 
+nonebot.load_plugin("nonebot_plugin_datastore")
 
 # 本地插件
 nonebot.load_plugins("plugins")
 
+startup_profiler.schedule_report(driver)
+
 
 if __name__ == "__main__":
     nonebot.run()
-
@@ -1,9 +1,13 @@
+import asyncio
 from pathlib import Path
 from nonebot import get_driver, load_plugins, logger
 from nonebot.plugin import PluginMetadata
 
 from .db.models import init_madoka_db
+from .db.user_source import UserAccount
+from .registry import skin_registry
 from .config import MainConfig
+from . import latency  # 注册延迟统计钩子
 
 __plugin_meta__ = PluginMetadata(
     name="樋口円香聊天机器人",
@@ -15,6 +19,16 @@ __plugin_meta__ = PluginMetadata(
 
 #初始化数据库
 driver = get_driver()
+_background: set = set()
+
+
+async def _migrate_skin_keys():
+    try:
+        # 在线程中扫描皮肤目录（只计算摘要），之后再把库中的旧版键迁移为内容键
+        await skin_registry.load()
+        await UserAccount.migrate_skin_keys()
+    except Exception as e:
+        logger.error(f"[Madoka]皮肤数据迁移失败: {e}")
 
 @driver.on_startup
 async def _():
@@ -23,6 +37,11 @@ async def _():
         logger.info("[Madoka]数据库初始化完成")
     except Exception as e:
         logger.error(f"[Madoka]数据库初始化失败，请检查数据库配置或文件权限: {e}")
+        return
+    # 迁移期间旧键仍可通过 resolve_key 解析，放到后台，不阻塞后续启动流程
+    task = asyncio.create_task(_migrate_skin_keys())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
 
 #加载子插件
 inline_plugins_path = str(Path(__file__).parent.joinpath("plugins").resolve())
@@ -0,0 +1,176 @@
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    expires: float  # time.monotonic()，inf 表示不过期
+    size: int
+    seq: int
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0  # 因容量淘汰
+    expirations: int = 0  # 因过期移除
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TTLCache(Generic[K, V]):
+    """
+    TTL + LRU 缓存
+    - OrderedDict 维护最近使用顺序，get/set 均为 O(1)
+    - 过期时间放在最小堆里，清扫时只弹出堆顶已过期的条目
+    - 可同时限制条目数与总字节数（需提供 sizeof）
+    - 所有操作都是同步且不等待的，可以直接在事件循环中使用，无需加锁
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+        name: str = "",
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda _: 0)
+        self.name = name
+        self.stats = CacheStats()
+        self._data: "OrderedDict[K, _Entry[V]]" = OrderedDict()
+        self._heap: List[Tuple[float, int, K]] = []
+        self._seq = itertools.count()
+        self._bytes = 0
+
+    # ---------- 内部 ----------
+
+    def _remove(self, key: K) -> Optional[_Entry[V]]:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _evict(self) -> None:
+        while self._data and (
+            len(self._data) > self.maxsize
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, entry = self._data.popitem(last=False)
+            self._bytes -= entry.size
+            self.stats.evictions += 1
+
+    def sweep(self) -> int:
+        """移除所有已过期条目，返回移除数量"""
+        now = time.monotonic()
+        removed = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, seq, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            if entry is not None and entry.seq == seq:
+                self._remove(key)
+                self.stats.expirations += 1
+                removed += 1
+        # 堆中失效的旧记录过多时重建
+        if len(heap) > 2 * len(self._data) + 64:
+            self._heap = [
+                (e.expires, e.seq, k) for k, e in self._data.items() if e.expires != float("inf")
+            ]
+            heapq.heapify(self._heap)
+        return removed
+
+    # ---------- 读写 ----------
+
+    def get(self, key: K, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return default
+        if entry.expires <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return entry.value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else float("inf")
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self._remove(key)
+            return
+
+        self._remove(key)
+        seq = next(self._seq)
+        self._data[key] = _Entry(value, expires, size, seq)
+        self._bytes += size
+        if expires != float("inf"):
+            heapq.heappush(self._heap, (expires, seq, key))
+
+        self.sweep()
+        self._evict()
+
+    def pop(self, key: K, default: Any = None) -> Any:
+        entry = self._remove(key)
+        return default if entry is None else entry.value
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._heap.clear()
+        self._bytes = 0
+
+    async def get_or_load(
+        self,
+        key: K,
+        loader: Callable[[], Awaitable[V]],
+        ttl: Optional[float] = None,
+    ) -> V:
+        """命中直接返回，否则等待 loader 结果并写入缓存"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = await loader()
+        self.set(key, value, ttl)
+        return value
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry.expires > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def summary(self) -> str:
+        s = self.stats
+        size = f"，{self._bytes / 1024:.0f}KB" if self.max_bytes is not None else ""
+        return (
+            f"{self.name or 'cache'}: {len(self)}/{self.maxsize} 条{size}，"
+            f"命中率 {s.hit_rate:.0%}（{s.hits}/{s.hits + s.misses}），"
+            f"淘汰 {s.evictions}，过期 {s.expirations}"
+        )
+
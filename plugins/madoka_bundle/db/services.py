@@ -2,6 +2,7 @@ from typing import Type, TypeVar, Tuple
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from .models import UserStats, SignRecord, UserSkin
+from ..registry import skin_registry
 
 T = TypeVar("T")
 
@@ -13,6 +14,10 @@ class UserService:
         """获取并初始化用户核心数据"""
         user = await get_or_create(session, UserStats, user_id=uid)
         sign = await get_or_create(session, SignRecord, user_id=uid)
+        # 新用户的默认皮肤是旧版 skinNN 键，写入前换成内容键
+        resolved = skin_registry.resolve_key(user.skin_key)
+        if resolved and resolved != user.skin_key:
+            user.skin_key = resolved
         await get_or_create(session, UserSkin, user_id=uid, skin_key=user.skin_key)
         return user, sign
     
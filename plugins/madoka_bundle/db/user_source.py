@@ -1,7 +1,8 @@
 from sqlalchemy import select
 from nonebot_plugin_datastore import create_session
+from nonebot import logger
 from .models import UserStats, UserInventory, ShopItem, UserSkin
-from ..registry import SKIN_MAP, DEFAULT_SKIN
+from ..registry import skin_registry, DEFAULT_SKIN
 
 class UserAccount:
     """用户账务处理类"""
@@ -53,8 +54,9 @@ class UserAccount:
         """
         设置皮肤相关
         """
-        # 资源层校验
-        if skin_key not in SKIN_MAP:                                                                
+        # 资源层校验（兼容旧版 skinNN 键）
+        skin_key = skin_registry.resolve_key(skin_key)
+        if skin_key is None:
             return False
 
         async with create_session() as session:
@@ -63,16 +65,13 @@ class UserAccount:
                 return False
 
             # 已是当前皮肤
-            if user.skin_key == skin_key:
+            if skin_registry.resolve_key(user.skin_key) == skin_key:
                 return True
 
-            # 仓库校验
-            stmt = select(UserSkin).where(
-                UserSkin.user_id == uid,
-                UserSkin.skin_key == skin_key
-            )
-            owned = (await session.execute(stmt)).scalar_one_or_none()
-            if not owned:
+            # 仓库校验（库存中可能仍是旧版键，统一解析后比较）
+            stmt = select(UserSkin.skin_key).where(UserSkin.user_id == uid)
+            owned_keys = (await session.execute(stmt)).scalars().all()
+            if not any(skin_registry.resolve_key(k) == skin_key for k in owned_keys):
                 return False
 
             user.skin_key = skin_key
@@ -91,18 +90,53 @@ class UserAccount:
             if not user or not user.skin_key:
                 return DEFAULT_SKIN
 
-            if user.skin_key not in SKIN_MAP:
+            resolved = skin_registry.resolve_key(user.skin_key)
+            if resolved is None:
                 return DEFAULT_SKIN
 
-            return user.skin_key
+            return resolved
     
     
+    @staticmethod
+    async def migrate_skin_keys() -> int:
+        """
+        把库中的旧版 skinNN 键改写为内容键，返回改动的行数
+        同一用户的库存改写后出现重复时只保留最早的一条
+        """
+        changed = 0
+        async with create_session() as session:
+            users = (await session.execute(select(UserStats))).scalars().all()
+            for user in users:
+                resolved = skin_registry.resolve_key(user.skin_key) if user.skin_key else None
+                if resolved and resolved != user.skin_key:
+                    user.skin_key = resolved
+                    changed += 1
+
+            seen = set()
+            skins = (await session.execute(select(UserSkin).order_by(UserSkin.id))).scalars().all()
+            for skin in skins:
+                resolved = skin_registry.resolve_key(skin.skin_key) or skin.skin_key
+                if (skin.user_id, resolved) in seen:
+                    await session.delete(skin)
+                    changed += 1
+                    continue
+                seen.add((skin.user_id, resolved))
+                if resolved != skin.skin_key:
+                    skin.skin_key = resolved
+                    changed += 1
+
+            await session.commit()
+        if changed:
+            logger.info(f"[Madoka]已将 {changed} 条旧版皮肤键迁移为内容键")
+        return changed
+
     #添加皮肤库存
     @staticmethod
     async def add_skin(uid: str, skin_key: str) -> bool:
         """
         给用户添加一个皮肤（仅库存）
         """
+        skin_key = skin_registry.resolve_key(skin_key) or skin_key
         async with create_session() as session:
             user = await session.get(UserStats, uid)
             if not user:
@@ -0,0 +1,190 @@
+import math
+import time
+import weakref
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from nonebot.adapters import Bot, Event
+from nonebot.matcher import Matcher, current_event, current_matcher
+from nonebot.message import event_preprocessor, event_postprocessor, run_preprocessor, run_postprocessor
+
+# 统计阶段
+# queue    : 平台事件时间 -> 机器人收到事件
+# dispatch : 收到事件 -> 处理器开始执行
+# db       : 处理器开始 -> 数据读取完成（数据库 / Steam API）
+# render   : 数据读取完成 -> 图片渲染完成
+# send     : 上一阶段 -> 最后一条消息发送成功
+# total    : 收到事件 -> 最后一条消息发送成功
+STAGES = ("queue", "dispatch", "db", "render", "send", "total")
+WINDOW_SIZE = 512  # 每个处理器每个阶段保留的样本数
+SEND_APIS = {"send_msg", "send_group_msg", "send_private_msg", "send_forward_msg"}
+
+
+@dataclass
+class Run:
+    """一次处理器执行的时间戳（time.time()）"""
+    label: str
+    event_time: float
+    received: float
+    started: float
+    stamps: Dict[str, float] = field(default_factory=dict)
+
+    def durations(self) -> Dict[str, float]:
+        """各阶段耗时（毫秒），未打点的阶段不计入"""
+        result = {
+            "queue": max(0.0, self.received - self.event_time) * 1000,
+            "dispatch": (self.started - self.received) * 1000,
+        }
+        prev = self.started
+        for stage in ("db", "render", "send"):
+            if stage in self.stamps:
+                result[stage] = (self.stamps[stage] - prev) * 1000
+                prev = self.stamps[stage]
+        if "send" in self.stamps:
+            result["total"] = (self.stamps["send"] - self.received) * 1000
+        return result
+
+
+def matcher_label(matcher: Matcher) -> str:
+    """
+    统计名称：插件名 / 命令
+    同一插件下的多个处理器分开统计，命令取第一个触发词，没有命令的按事件类型区分
+    """
+    plugin = matcher.plugin_name or matcher.module_name or "unknown"
+    for checker in matcher.rule.checkers:
+        rule = checker.call
+        if cmds := getattr(rule, "cmds", None):  # on_command / on_shell_command
+            return f"{plugin}/{''.join(cmds[0])}"
+        if msg := getattr(rule, "msg", None):  # fullmatch / startswith / endswith
+            return f"{plugin}/{msg[0]}"
+        if (command := getattr(rule, "command", None)) is not None:  # on_alconna
+            if isinstance(command, weakref.ref):
+                command = command()
+            if name := getattr(command, "name", None):
+                return f"{plugin}/{name}"
+    return f"{plugin}/{matcher.type or 'unknown'}"
+
+
+class LatencyTracker:
+    """按处理器统计各阶段耗时的滚动分位数"""
+
+    def __init__(self, window: int = WINDOW_SIZE):
+        self.window = window
+        self._received: Dict[int, Tuple[float, float]] = {}  # id(event) -> (事件时间, 收到时间)
+        self._runs: Dict[int, Dict[int, Run]] = {}  # id(event) -> id(matcher) -> Run
+        self._samples: Dict[str, Dict[str, Deque[float]]] = defaultdict(
+            lambda: defaultdict(lambda: deque(maxlen=self.window))
+        )
+        self._labels: Dict[type, str] = {}  # 处理器类 -> 统计名称
+
+    # ---------- 打点 ----------
+
+    def receive(self, event: Event) -> None:
+        event_time = float(getattr(event, "time", 0) or time.time())
+        self._received[id(event)] = (event_time, time.time())
+
+    def start(self, event: Event, matcher: Matcher) -> None:
+        event_time, received = self._received.get(id(event), (time.time(), time.time()))
+        self._runs.setdefault(id(event), {})[id(matcher)] = Run(
+            label=self.label(matcher),
+            event_time=event_time,
+            received=received,
+            started=time.time(),
+        )
+
+    def label(self, matcher: Matcher) -> str:
+        """处理器的统计名称，见 matcher_label"""
+        label = self._labels.get(type(matcher))
+        if label is None:
+            label = self._labels[type(matcher)] = matcher_label(matcher)
+        return label
+
+    def _current(self) -> Optional[Run]:
+        event = current_event.get(None)
+        matcher = current_matcher.get(None)
+        if event is None or matcher is None:
+            return None
+        return self._runs.get(id(event), {}).get(id(matcher))
+
+    def tag(self, detail: str) -> None:
+        """
+        在处理器内细化统计名称，例如 steam 的子命令
+        名称为 插件名/命令/detail，与自动生成的名称格式一致
+        """
+        if run := self._current():
+            run.label = f"{self.label(current_matcher.get())}/{detail}"
+
+    def mark(self, stage: str) -> None:
+        """在处理器内记录阶段完成时间"""
+        if run := self._current():
+            run.stamps[stage] = time.time()
+
+    def finish(self, event: Event, matcher: Matcher) -> None:
+        run = self._runs.get(id(event), {}).pop(id(matcher), None)
+        # 未发送消息的执行（如被忽略的通知）不计入统计
+        if run is None or "send" not in run.stamps:
+            return
+        samples = self._samples[run.label]
+        for stage, value in run.durations().items():
+            samples[stage].append(value)
+
+    def discard(self, event: Event) -> None:
+        self._received.pop(id(event), None)
+        self._runs.pop(id(event), None)
+
+    # ---------- 统计 ----------
+
+    @staticmethod
+    def _percentile(values: List[float], pct: float) -> float:
+        index = min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))
+        return values[index]
+
+    def percentiles(self, label: str, stage: str = "total") -> Optional[Tuple[float, float, float]]:
+        values = sorted(self._samples.get(label, {}).get(stage, ()))
+        if not values:
+            return None
+        return tuple(self._percentile(values, p) for p in (50, 95, 99))
+
+    def report(self) -> str:
+        if not self._samples:
+            return "暂无延迟数据"
+        lines = ["延迟统计 p50/p95/p99 (ms)："]
+        for label in sorted(self._samples):
+            samples = self._samples[label]
+            count = len(samples.get("total", ()))
+            lines.append(f"【{label}】样本 {count}")
+            for stage in STAGES:
+                pct = self.percentiles(label, stage)
+                if pct:
+                    lines.append(f"  {stage:<8} {pct[0]:.0f} / {pct[1]:.0f} / {pct[2]:.0f}")
+        return "\n".join(lines)
+
+
+tracker = LatencyTracker()
+
+
+@event_preprocessor
+async def _(event: Event):
+    tracker.receive(event)
+
+
+@run_preprocessor
+async def _(event: Event, matcher: Matcher):
+    tracker.start(event, matcher)
+
+
+@run_postprocessor
+async def _(event: Event, matcher: Matcher):
+    tracker.finish(event, matcher)
+
+
+@event_postprocessor
+async def _(event: Event):
+    tracker.discard(event)
+
+
+@Bot.on_called_api
+async def _(bot: Bot, exception: Optional[Exception], api: str, data: dict, result):
+    if exception is None and api in SEND_APIS:
+        tracker.mark("send")
@@ -3,6 +3,7 @@ from nonebot.adapters.onebot.v11 import MessageEvent, MessageSegment # 导入 Me
 from nonebot.plugin import PluginMetadata
 from nonebot.params import CommandArg
 from .utils import SET_COMMANDS
+from ...latency import tracker
 
 __plugin_meta__ = PluginMetadata(
     name="通用插件",
@@ -35,7 +36,9 @@ async def _(event: MessageEvent, arg=CommandArg()):
     cmd = SET_COMMANDS.get(key)
     if not cmd:
         await user_set.finish("未知设置项，使用 /设置 查看可用命令")
-        
+
+    tracker.tag(key)
+
     msg = await cmd.handler(uid, username, args)
     await user_set.finish(msg)
 
@@ -64,6 +67,8 @@ async def _(event: MessageEvent, arg=CommandArg()):
     if not cmd:
         await user_query.finish("未知查询，使用 /查询 查看可用命令")
 
+    tracker.tag(key)
+
     msg = await cmd.handler(uid, username, args)
     
     if isinstance(msg, MessageSegment):
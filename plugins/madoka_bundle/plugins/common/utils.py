@@ -1,12 +1,15 @@
 from dataclasses import dataclass
 from typing import Callable, Awaitable, Union, Any
+from nonebot import logger
 from nonebot.adapters.onebot.v11 import MessageSegment
 from nonebot_plugin_datastore import create_session
 from ...db.user_source import UserAccount
-from ...registry import SKIN_MAP
+from ...registry import skin_registry
 from ...render.utils import render_sign_card
+from ...render.skin_sheet import render_skin_sheet
 from ...db.models import UserStats, SignRecord 
 from ...db.services import UserService
+from ...latency import tracker
 
 @dataclass
 class SetCommand:
@@ -41,10 +44,18 @@ async def handle_set_avatar(uid: str, username: str, args: list[str]) -> str:
     return f"头像已切换为 {args[0]}"
 
 @register_set_command(name="立绘", usage="查询 立绘")
-async def handle_query_skin(uid: str, username: str, args: list[str]) -> str:
-    if not SKIN_MAP:
+async def handle_query_skin(uid: str, username: str, args: list[str]) -> Union[str, MessageSegment]:
+    if not skin_registry:
         return "当前没有可用的立绘"
-    lines = [f"{key} : {path.name}" for key, path in SKIN_MAP.items()]
+    try:
+        sheet = await render_skin_sheet()
+        tracker.mark("render")
+        if sheet:
+            return MessageSegment.image(sheet)
+    except Exception as e:
+        logger.warning(f"[Madoka]生成皮肤预览图失败: {e}")
+    # 预览图不可用时退回文字列表
+    lines = [f"{skin.key} : {skin.path.name}" for skin in skin_registry]
     return "可用立绘列表：\n" + "\n".join(lines)
 
 @register_set_command(name="资料", usage="查询 资料")
@@ -52,6 +63,7 @@ async def handle_query_profile(uid: str, username: str, args: list[str]) -> Unio
     
     async with create_session() as session:
         user, sign = await UserService.get_user_data(session, uid)
+    tracker.mark("db")
 
     user.nickname = username 
     
@@ -62,6 +74,7 @@ async def handle_query_profile(uid: str, username: str, args: list[str]) -> Unio
             sign=sign,           
             reward_data=None     
         )
+        tracker.mark("render")
         return msg
     except Exception as e:
         return f"渲染失败：{str(e)}"
\ No newline at end of file
@@ -1,15 +1,18 @@
-from nonebot import on_message
+from nonebot import on_message, on_command
 from nonebot.rule import fullmatch
 from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.plugin import PluginMetadata
+from nonebot.permission import SUPERUSER
+from nonebot.matcher import Matcher
 
 from .config import EchoConfig, config
 from ...utils import get_latency_ms 
+from ...latency import tracker
 
 __plugin_meta__ = PluginMetadata(
     name="状态测试",
     description="简单的存活测试插件",
-    usage="发送关键词获取响应",
+    usage="发送关键词获取响应；超级用户发送 /延迟统计 查看各处理器延迟分位数",
     type="application",
     config=EchoConfig,
 )
@@ -18,6 +21,18 @@ __plugin_meta__ = PluginMetadata(
 echo = on_message( rule=fullmatch(config.echo_keywords) , priority=10 , block=True )
 
 @echo.handle()
-async def _(event: MessageEvent):
+async def _(event: MessageEvent, matcher: Matcher):
     ms = get_latency_ms(event)
-    await echo.finish(f"{config.echo_reply} ({ms:.0f}ms)")
\ No newline at end of file
+    reply = f"{config.echo_reply} ({ms:.0f}ms)"
+    # 与记录时使用同一个统计名称
+    pct = tracker.percentiles(tracker.label(matcher))
+    if pct:
+        reply += f"\np50/p95/p99: {pct[0]:.0f}/{pct[1]:.0f}/{pct[2]:.0f}ms"
+    await echo.finish(reply)
+
+# 各处理器分阶段延迟（仅超级用户）
+latency_report = on_command("延迟统计", permission=SUPERUSER, priority=10, block=True)
+
+@latency_report.handle()
+async def _():
+    await latency_report.finish(tracker.report())
\ No newline at end of file
@@ -1,21 +1,35 @@
-from nonebot import on_notice
+import asyncio
+
+from nonebot import on_notice, get_driver
 from nonebot.adapters.onebot.v11 import PokeNotifyEvent
-from ...constants import ResType, SubFolder
-from ...utils import get_random_res
 from nonebot.plugin import PluginMetadata
 
+from .config import PokeConfig, config
+from .utils import voice_cache, get_random_voice
+
 
 __plugin_meta__ = PluginMetadata(
     name="戳一戳",
     description="戳一戳插件",
     usage="戳一戳机器人，可以返回一句円香语音",
     type="application",
+    config=PokeConfig,
 )
 
+driver = get_driver()
+_preload_task = None
+
+@driver.on_startup
+async def _():
+    # 后台预转码，不阻塞启动
+    global _preload_task
+    if config.poke_voice_preload:
+        _preload_task = asyncio.create_task(voice_cache.preload())
+
 
 poke = on_notice()
 
 @poke.handle()
 async def _(event: PokeNotifyEvent):
     if event.target_id != event.self_id: return
-    await poke.finish(get_random_res(ResType.AUDIO, SubFolder.POKE))
\ No newline at end of file
+    await poke.finish(await get_random_voice())
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from nonebot import get_plugin_config
+from typing import Optional
+
+class PokeConfig(BaseModel):
+    # 本地预转码方式，转成 QQ 原生的 silk / amr 后 OneBot 端不再每次转码
+    # - "auto": 装有 ffmpeg 和 pysilk（silk-python）时转 silk，ffmpeg 带 libopencore_amrnb 时转 amr，
+    #           都没有时直接发送原始音频（OneBot 端仍会每次转码，首次使用时会给出警告）
+    # - 自定义命令，{input}/{output} 为占位符，
+    #   例如: "ffmpeg -y -i {input} -ar 8000 -ac 1 -c:a libopencore_amrnb {output}"
+    # - 留空: 不转码，直接发送原始音频
+    poke_voice_encoder: Optional[str] = "auto"
+    poke_voice_format: str = "amr"  # 自定义命令输出的文件后缀
+    poke_voice_cache_size: int = 32 * 1024 * 1024  # 内存缓存上限（字节）
+    poke_voice_preload: bool = True  # 启动时预先转码
+
+# 实例化配置
+config = get_plugin_config(PokeConfig)
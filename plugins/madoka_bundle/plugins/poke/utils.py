@@ -0,0 +1,200 @@
+import asyncio
+import importlib.util
+import random
+import shlex
+import shutil
+import tempfile
+from collections import defaultdict
+from io import BytesIO
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from nonebot import logger
+from nonebot.adapters.onebot.v11 import MessageSegment
+
+from ...cache import TTLCache
+from ...constants import ResType, SubFolder
+from ...utils import get_files, to_segment
+from .config import config
+
+VoiceKey = Tuple[str, int, int]  # (文件名, 大小, mtime)
+
+AUTO = "auto"
+SILK = "silk"  # 内置流程：ffmpeg 解码为 PCM，pysilk 编码
+SILK_SAMPLE_RATE = 24000
+AMR_ENCODER = "libopencore_amrnb"  # 很多 ffmpeg 构建没有这个编码器
+AMR_COMMAND = f"ffmpeg -y -v error -i {{input}} -ar 8000 -ac 1 -c:a {AMR_ENCODER} {{output}}"
+FAILURE_TTL = 3600  # 转码失败的语音在这段时间内不再重试（秒）
+
+
+async def _has_ffmpeg_encoder(name: str) -> bool:
+    try:
+        encoders = await _run(["ffmpeg", "-hide_banner", "-encoders"])
+    except Exception:
+        return False
+    return any(
+        len(parts) > 1 and parts[1] == name
+        for parts in (line.split() for line in encoders.decode(errors="ignore").splitlines())
+    )
+
+
+async def resolve_encoder(setting: Optional[str], fmt: str) -> Tuple[Optional[str], str]:
+    """
+    把配置解析为 (编码方式, 输出后缀)
+    auto 时按本机可用的工具选择：pysilk -> silk，ffmpeg 带 amr 编码器 -> amr，
+    都不可用时返回 None（不转码）
+    """
+    if not setting:
+        return None, ""
+    if setting != AUTO:
+        return setting, fmt
+    if shutil.which("ffmpeg") is None:
+        return None, ""
+    if importlib.util.find_spec("pysilk") is not None:
+        return SILK, "silk"
+    if await _has_ffmpeg_encoder(AMR_ENCODER):
+        return AMR_COMMAND, "amr"
+    return None, ""
+
+
+def _silk_encode(pcm: bytes) -> bytes:
+    import pysilk
+
+    output = BytesIO()
+    pysilk.encode(BytesIO(pcm), output, SILK_SAMPLE_RATE, SILK_SAMPLE_RATE)
+    return output.getvalue()
+
+
+async def _run(cmd: List[str]) -> bytes:
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(stderr.decode(errors="ignore").strip()[-200:])
+    return stdout
+
+
+class VoiceCache:
+    """
+    戳一戳语音缓存
+    - 在本地预先转码为 silk / amr，OneBot 端无需每次读取并转码
+    - 编码方式在第一次使用时检测一次
+    - 按字节数限制容量，超出时淘汰最久未使用的语音
+    - 转码失败的语音记录 FAILURE_TTL 秒，期间直接失败，由调用方发送文件路径
+    """
+
+    def __init__(self, encoder: Optional[str], fmt: str, max_bytes: int):
+        self.setting = encoder
+        self.encoder: Optional[str] = None
+        self.fmt = fmt
+        self._resolved = False
+        self._resolve_lock = asyncio.Lock()
+        self.max_bytes = max_bytes
+        self._data: TTLCache[VoiceKey, bytes] = TTLCache(
+            maxsize=4096, max_bytes=max_bytes, sizeof=len, name="poke voice"
+        )
+        self._failures: TTLCache[VoiceKey, str] = TTLCache(
+            maxsize=1024, ttl=FAILURE_TTL, name="poke voice failures"
+        )
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def _resolve(self) -> None:
+        async with self._resolve_lock:
+            if self._resolved:
+                return
+            self.encoder, self.fmt = await resolve_encoder(self.setting, self.fmt)
+            self._resolved = True
+            if self.setting and self.encoder is None:
+                logger.warning(
+                    "[Madoka]未找到可用的转码工具（ffmpeg + pysilk 或带 libopencore_amrnb 的 ffmpeg），"
+                    "戳一戳语音将以原始格式发送，由 OneBot 端每次转码"
+                )
+
+    @staticmethod
+    def _key(path: Path) -> VoiceKey:
+        stat = path.stat()
+        return path.name, stat.st_size, stat.st_mtime_ns
+
+    async def _encode(self, path: Path) -> bytes:
+        if not self.encoder:
+            return await asyncio.to_thread(path.read_bytes)
+
+        if self.encoder == SILK:
+            pcm = await _run([
+                "ffmpeg", "-v", "error", "-i", str(path),
+                "-f", "s16le", "-ar", str(SILK_SAMPLE_RATE), "-ac", "1", "-",
+            ])
+            return await asyncio.to_thread(_silk_encode, pcm)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / f"voice.{self.fmt}"
+            cmd = [
+                part.format(input=str(path), output=str(output))
+                for part in shlex.split(self.encoder)
+            ]
+            await _run(cmd)
+            if not output.exists():
+                raise RuntimeError(f"转码命令没有生成 {output.name}")
+            return await asyncio.to_thread(output.read_bytes)
+
+    async def get(self, path: Path) -> bytes:
+        key = self._key(path)
+        data = self._data.get(key)
+        if data is not None:
+            return data
+        if (error := self._failures.get(key)) is not None:
+            raise RuntimeError(error)
+        if not self._resolved:
+            await self._resolve()
+
+        try:
+            async with self._locks[key]:
+                data = self._data.get(key)
+                if data is None:
+                    if (error := self._failures.get(key)) is not None:
+                        raise RuntimeError(error)
+                    try:
+                        data = await self._encode(path)
+                    except Exception as e:
+                        self._failures.set(key, f"转码失败: {e}")
+                        raise
+                    self._data.set(key, data)
+        finally:
+            self._locks.pop(key, None)
+        return data
+
+    async def preload(self) -> None:
+        """依次转码全部语音，直到缓存装满"""
+        loaded = 0
+        for path in sorted(get_files(ResType.AUDIO, SubFolder.POKE)):
+            if self._data.bytes >= self.max_bytes:
+                break
+            try:
+                await self.get(path)
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"[Madoka]语音 {path.name} 转码失败: {e}")
+        logger.info(f"[Madoka]戳一戳语音预加载完成: {loaded} 条, {self._data.bytes / 1024:.0f}KB")
+
+
+voice_cache = VoiceCache(
+    config.poke_voice_encoder,
+    config.poke_voice_format,
+    config.poke_voice_cache_size,
+)
+
+
+async def get_random_voice() -> MessageSegment:
+    """随机一条语音，优先发送缓存中的字节，失败时退回 file:// 路径"""
+    files = get_files(ResType.AUDIO, SubFolder.POKE)
+    if not files:
+        return MessageSegment.text(f"缺少资源: {ResType.AUDIO.value}/{SubFolder.POKE.value}")
+    path = random.choice(files)
+    try:
+        return MessageSegment.record(file=await voice_cache.get(path))
+    except Exception as e:
+        logger.warning(f"[Madoka]读取语音缓存失败，改为发送文件路径: {e}")
+        return to_segment(ResType.AUDIO, path)
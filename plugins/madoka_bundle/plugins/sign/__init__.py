@@ -11,6 +11,7 @@ from nonebot_plugin_datastore import create_session
 from .config import SignConfig, config
 from .utils import get_sign_status, execute_sign_update
 from ...render.utils import render_sign_card
+from ...latency import tracker
 
 
 __plugin_meta__ = PluginMetadata(
@@ -48,6 +49,7 @@ async def _(event: MessageEvent):
                     reward_data = await execute_sign_update(user, sign, session)
                     await session.refresh(user)
                     await session.refresh(sign)
+            tracker.mark("db")
             
             # 传入参数：username, user, sign, reward_data
             image_msg = await render_sign_card(
@@ -56,6 +58,7 @@ async def _(event: MessageEvent):
                 sign=sign, 
                 reward_data=reward_data
             )
+            tracker.mark("render")
             
             await sign_matcher.finish(image_msg)
 
@@ -1,16 +1,266 @@
+from __future__ import annotations
 
-
-from typing import Dict
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from io import BytesIO
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from nonebot import logger
 
+from .config import assets
 from .constants import ResType, SubFolder
-from .utils import get_indexed_files
+from .lazy import lazy_import
+from .utils import get_files
+
+Image = lazy_import("PIL.Image")
+
+# 皮肤缩略图尺寸（宽, 高）
+THUMBNAIL_SIZE: Tuple[int, int] = (180, 240)
+
+DEFAULT_SKIN = "skin01"
+
+# 旧版 skinNN -> 内容摘要，首次运行时按当时的目录顺序冻结，保存在皮肤目录下
+LEGACY_FILE = ".legacy_keys.json"
+
+
+@dataclass(frozen=True)
+class SkinEntry:
+    """单个皮肤资源"""
+    key: str
+    path: Path
+    digest: str
+
+    @property
+    def name(self) -> str:
+        return self.path.stem
+
+    @cached_property
+    def thumbnail(self) -> Optional[Image.Image]:
+        """RGBA 缩略图，首次访问时解码（生成预览图时才需要），失败返回 None"""
+        try:
+            with Image.open(self.path) as img:
+                thumbnail = img.convert("RGBA")
+        except Exception as e:
+            logger.warning(f"[Madoka]皮肤 {self.path.name} 解码失败: {e}")
+            return None
+        thumbnail.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
+        return thumbnail
+
+    @cached_property
+    def data_uri(self) -> str:
+        """base64 编码后的立绘，首次访问时生成"""
+        return f"data:image/png;base64,{base64.b64encode(self.path.read_bytes()).decode()}"
+
+
+@dataclass(frozen=True)
+class SkinSnapshot:
+    """某一时刻皮肤目录的不可变快照，重载时整体替换"""
+    version: int
+    signature: Tuple[Tuple[str, int, int], ...]
+    entries: Dict[str, SkinEntry]
+    aliases: Dict[str, str]  # 旧版序号键 skinNN -> 内容键
+
+    @cached_property
+    def digest(self) -> str:
+        """由全部皮肤键与文件名计算的摘要，跨重启保持稳定"""
+        items = sorted(f"{key}:{entry.name}" for key, entry in self.entries.items())
+        return hashlib.sha1(",".join(items).encode()).hexdigest()[:12]
+
+
+class SkinRegistry:
+    """
+    皮肤注册表
+    - 键由文件内容哈希生成（skin-xxxxxxxx），插入新文件不会改变已有键
+    - 首次访问时才扫描目录，只计算内容摘要；缩略图在生成预览图时才解码
+    - 目录变化时在后台线程中重载，新快照构建完成后整体替换
+    - 兼容旧版按序号生成的 skinNN 键：序号与文件的对应关系在首次运行时冻结，
+      之后增删文件不会改变旧键指向的皮肤
+    """
+
+    def __init__(
+        self,
+        res_type: ResType,
+        plugin: SubFolder,
+        prefix: str = "skin",
+        check_interval: float = 5.0,
+    ):
+        self.res_type = res_type
+        self.plugin = plugin
+        self.prefix = prefix
+        self.check_interval = check_interval
+        self._snapshot: Optional[SkinSnapshot] = None
+        self._checked_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._legacy: Optional[Dict[str, str]] = None
+        # (文件名, 大小, mtime) -> 皮肤，重载时未变化的文件不再哈希，已解码的缩略图也保留
+        self._known: Dict[Tuple[str, int, int], SkinEntry] = {}
+
+    # ---------- 快照 ----------
+
+    def _scan(self) -> Tuple[List[Path], Tuple[Tuple[str, int, int], ...]]:
+        files = sorted(get_files(self.res_type, self.plugin))
+        signature = []
+        for path in files:
+            stat = path.stat()
+            signature.append((path.name, stat.st_size, stat.st_mtime_ns))
+        return files, tuple(signature)
+
+    def _entry(self, path: Path, sig: Tuple[str, int, int]) -> SkinEntry:
+        entry = self._known.get(sig)
+        if entry is None:
+            data = path.read_bytes()
+            # 只读取文件头确认是图片，不解码像素
+            with Image.open(BytesIO(data)):
+                pass
+            digest = hashlib.sha1(data).hexdigest()
+            entry = self._known[sig] = SkinEntry(
+                key=self._content_key(digest), path=path, digest=digest
+            )
+        return entry
+
+    def _content_key(self, digest: str) -> str:
+        return f"{self.prefix}-{digest[:8]}"
+
+    def _legacy_digests(self, files: List[Path]) -> Dict[str, str]:
+        """
+        旧版 skinNN -> 文件内容摘要
+        旧版按排序后的文件序号生成键，首次运行时按当时的目录写入文件，之后只读取不再重算
+        """
+        if self._legacy is not None:
+            return self._legacy
+        path = assets.get_dir(self.res_type, self.plugin) / LEGACY_FILE
+        if path.exists():
+            try:
+                self._legacy = json.loads(path.read_text("utf-8"))
+                return self._legacy
+            except (OSError, ValueError) as e:
+                logger.warning(f"[Madoka]读取 {path} 失败，旧版皮肤键可能无法解析: {e}")
+                self._legacy = {}
+                return self._legacy
+
+        self._legacy = {
+            f"{self.prefix}{i:02d}": hashlib.sha1(file.read_bytes()).hexdigest()
+            for i, file in enumerate(files, start=1)
+        }
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._legacy, f, indent=4)
+            os.replace(tmp, path)
+        except OSError as e:
+            Path(tmp).unlink(missing_ok=True)
+            logger.warning(f"[Madoka]写入 {path} 失败: {e}")
+        return self._legacy
+
+    def _build(self, files: List[Path], signature: Tuple[Tuple[str, int, int], ...]) -> SkinSnapshot:
+        entries: Dict[str, SkinEntry] = {}
+        for path, sig in zip(files, signature):
+            try:
+                entry = self._entry(path, sig)
+            except Exception as e:
+                logger.warning(f"[Madoka]皮肤 {path.name} 无法识别，已跳过: {e}")
+                continue
+            if entry.key in entries:
+                # 内容完全相同的文件只保留一份
+                continue
+            entries[entry.key] = entry
+
+        # 旧键只指向冻结时对应的内容，文件被删除后旧键失效
+        aliases = {
+            legacy: self._content_key(digest)
+            for legacy, digest in self._legacy_digests(files).items()
+            if self._content_key(digest) in entries
+        }
+
+        # 清理已不存在的文件
+        live = set(signature)
+        self._known = {k: v for k, v in self._known.items() if k in live}
+
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        return SkinSnapshot(version=version, signature=signature, entries=entries, aliases=aliases)
+
+    def reload(self, force: bool = False) -> SkinSnapshot:
+        """目录有变化（或 force）时重建快照；会读盘和哈希，在事件循环中应通过 load() 调用"""
+        files, signature = self._scan()
+        self._checked_at = time.monotonic()
+        if force or self._snapshot is None or signature != self._snapshot.signature:
+            snapshot = self._build(files, signature)
+            if self._snapshot is not None:
+                logger.info(f"[Madoka]皮肤目录已变化，重新加载 {len(snapshot.entries)} 个皮肤")
+            self._snapshot = snapshot
+        return self._snapshot
+
+    async def load(self, force: bool = False) -> SkinSnapshot:
+        """在线程中扫描并重建快照（不解码缩略图）"""
+        return await asyncio.to_thread(self.reload, force)
+
+    async def _refresh(self) -> None:
+        try:
+            await self.load()
+        except OSError as e:
+            logger.warning(f"[Madoka]检查皮肤目录失败，继续使用旧数据: {e}")
+
+    @property
+    def snapshot(self) -> SkinSnapshot:
+        if self._snapshot is None:
+            # 正常情况下启动时已经通过 load() 加载
+            return self.reload()
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._checked_at = time.monotonic()
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is None:
+                try:
+                    return self.reload()
+                except OSError as e:
+                    logger.warning(f"[Madoka]检查皮肤目录失败，继续使用旧数据: {e}")
+            elif self._refreshing is None or self._refreshing.done():
+                # 先返回当前快照，目录检查与哈希放到后台线程
+                self._refreshing = loop.create_task(self._refresh())
+        return self._snapshot
+
+    # ---------- 查询 ----------
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    def resolve_key(self, key: str) -> Optional[str]:
+        """将任意键（含旧版 skinNN）解析为内容键，不存在返回 None"""
+        snapshot = self.snapshot
+        if key in snapshot.entries:
+            return key
+        return snapshot.aliases.get(key)
+
+    def get(self, key: str) -> Optional[SkinEntry]:
+        resolved = self.resolve_key(key)
+        return self.snapshot.entries.get(resolved) if resolved else None
+
+    def default(self) -> Optional[SkinEntry]:
+        entry = self.get(DEFAULT_SKIN)
+        if entry is None and self.snapshot.entries:
+            entry = next(iter(self.snapshot.entries.values()))
+        return entry
+
+    def __contains__(self, key: str) -> bool:
+        return self.resolve_key(key) is not None
+
+    def __iter__(self) -> Iterator[SkinEntry]:
+        return iter(list(self.snapshot.entries.values()))
+
+    def __len__(self) -> int:
+        return len(self.snapshot.entries)
 
-#加载资源字典
-SKIN_MAP: Dict[str, Path] = get_indexed_files(
-    ResType.IMAGE,
-    SubFolder.CHAR,
-    prefix="skin"
-)
 
-DEFAULT_SKIN = "skin01"
\ No newline at end of file
+#全局皮肤注册表
+skin_registry = SkinRegistry(ResType.IMAGE, SubFolder.CHAR, prefix="skin")
@@ -1,4 +1,5 @@
 from .config import HTML_FILE_PATH
 from .utils import render_sign_card
+from .skin_sheet import render_skin_sheet
 
-__all__ = ["HTML_FILE_PATH", "render_sign_card"]
\ No newline at end of file
+__all__ = ["HTML_FILE_PATH", "render_sign_card", "render_skin_sheet"]
\ No newline at end of file
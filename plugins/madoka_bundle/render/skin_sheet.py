@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from nonebot import logger
+import nonebot_plugin_localstore as store
+
+from ..lazy import lazy_import
+from ..registry import skin_registry, SkinEntry, THUMBNAIL_SIZE
+from ..utils import get_file, ResType, SubFolder
+
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
+
+SHEET_COLUMNS = 5
+SHEET_PADDING = 16
+LABEL_HEIGHT = 40
+BACKGROUND = (244, 247, 249)
+TEXT_MAIN = (74, 78, 105)
+TEXT_SUB = (136, 136, 153)
+
+_cache_dir: Path = store.get_cache_dir("madoka_bundle")
+_sheet_cache: Dict[str, bytes] = {}  # 快照摘要 -> PNG
+_sheet_lock = asyncio.Lock()
+
+
+def _load_font(size: int) -> ImageFont.ImageFont:
+    font_file = get_file(ResType.FONT, SubFolder.SIGN, "font.ttf")
+    try:
+        return ImageFont.truetype(str(font_file), size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def _draw_sheet(entries: List[SkinEntry]) -> bytes:
+    """将全部皮肤缩略图拼成一张带编号的预览图，缩略图在这里第一次解码"""
+    entries = [entry for entry in entries if entry.thumbnail is not None]
+    cell_w, cell_h = THUMBNAIL_SIZE
+    cols = max(1, min(SHEET_COLUMNS, len(entries)))
+    rows = -(-len(entries) // cols)
+    width = SHEET_PADDING + cols * (cell_w + SHEET_PADDING)
+    height = SHEET_PADDING + rows * (cell_h + LABEL_HEIGHT + SHEET_PADDING)
+
+    canvas = np.empty((height, width, 3), dtype=np.float32)
+    canvas[:] = BACKGROUND
+
+    for i, entry in enumerate(entries):
+        row, col = divmod(i, cols)
+        thumb = np.asarray(entry.thumbnail, dtype=np.float32)
+        h, w = thumb.shape[:2]
+        # 缩略图在格子内底部居中
+        x = SHEET_PADDING + col * (cell_w + SHEET_PADDING) + (cell_w - w) // 2
+        y = SHEET_PADDING + row * (cell_h + LABEL_HEIGHT + SHEET_PADDING) + (cell_h - h)
+        alpha = thumb[..., 3:4] / 255.0
+        region = canvas[y:y + h, x:x + w]
+        region[:] = thumb[..., :3] * alpha + region * (1.0 - alpha)
+
+    image = Image.fromarray(canvas.astype(np.uint8), "RGB")
+    draw = ImageDraw.Draw(image)
+    key_font = _load_font(16)
+    name_font = _load_font(12)
+
+    for i, entry in enumerate(entries):
+        row, col = divmod(i, cols)
+        x = SHEET_PADDING + col * (cell_w + SHEET_PADDING)
+        y = SHEET_PADDING + row * (cell_h + LABEL_HEIGHT + SHEET_PADDING) + cell_h + 4
+        draw.text((x + cell_w // 2, y), entry.key, font=key_font, fill=TEXT_MAIN, anchor="ma")
+        name = entry.name if len(entry.name) <= 18 else entry.name[:17] + "…"
+        draw.text((x + cell_w // 2, y + 20), name, font=name_font, fill=TEXT_SUB, anchor="ma")
+
+    with BytesIO() as bio:
+        image.save(bio, format="PNG", optimize=True)
+        return bio.getvalue()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+async def render_skin_sheet() -> Optional[bytes]:
+    """
+    获取皮肤预览图
+    每个注册表版本只生成一次，结果同时缓存在内存与磁盘
+    没有任何皮肤时返回 None
+    """
+    snapshot = skin_registry.snapshot
+    if not snapshot.entries:
+        return None
+
+    cached = _sheet_cache.get(snapshot.digest)
+    if cached is not None:
+        return cached
+
+    async with _sheet_lock:
+        cached = _sheet_cache.get(snapshot.digest)
+        if cached is not None:
+            return cached
+
+        sheet_file = _cache_dir / f"skin_sheet_{snapshot.digest}.png"
+        if sheet_file.exists():
+            data = sheet_file.read_bytes()
+        else:
+            data = await asyncio.to_thread(_draw_sheet, list(snapshot.entries.values()))
+            try:
+                _write_atomic(sheet_file, data)
+                for old in _cache_dir.glob("skin_sheet_*.png"):
+                    if old != sheet_file:
+                        old.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"[Madoka]皮肤预览图写入缓存失败: {e}")
+
+        _sheet_cache.clear()
+        _sheet_cache[snapshot.digest] = data
+        return data
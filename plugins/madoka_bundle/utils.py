@@ -5,7 +5,7 @@ import platform
 import os
 import random
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import List, Optional
 from nonebot.adapters.onebot.v11 import MessageSegment
 from .constants import ResType, SubFolder
 from .config import assets
@@ -58,14 +58,3 @@ def get_random_res(res_type: ResType, plugin: SubFolder) -> MessageSegment:
     if not files:
         return MessageSegment.text(f"缺少资源: {res_type.value}/{plugin.value}")
     return to_segment(res_type, random.choice(files))
-
-def get_indexed_files(res_type: ResType, plugin: SubFolder, prefix: str = "image") -> Dict[str, Path]:
-    """
-    自动为目录下的文件生成稳定编号映射
-    例如：image01 -> xxx.png
-    """
-    files = sorted(get_files(res_type, plugin))
-    return {
-        f"{prefix}{i:02d}": path
-        for i, path in enumerate(files, start=1)
-    }
\ No newline at end of file
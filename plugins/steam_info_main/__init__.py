@@ -1,5 +1,4 @@
 import time
-import httpx
 import nonebot
 import re
 from io import BytesIO
@@ -15,7 +14,6 @@ from nonebot.adapters.onebot.v11 import GroupMessageEvent
 from nonebot.plugin import PluginMetadata, inherit_supported_adapters
 from nonebot.permission import SUPERUSER
 
-from PIL import Image as PILImage
 
 from nonebot_plugin_apscheduler import scheduler
 from nonebot_plugin_alconna import (
@@ -35,15 +33,27 @@ from nonebot_plugin_alconna import (
 
 import nonebot_plugin_localstore as store
 
-from .config import Config
-from .models import ProcessedPlayer
-from .data_source import BindData, SteamInfoData, ParentData, DisableParentData
+from ..madoka_bundle.lazy import lazy_import
+from ..madoka_bundle.latency import tracker
+from .config import Config, config
+from .client import http_clients
+from .disk_cache import image_cache
+from .avatars import avatar_store
+from .app_assets import app_asset_store
+from .http_cache import asset_fetcher
+from .polling import POLL_TICK, AdaptivePoller
+from .webapi import FetchStats, api_budget, schema_cache
+from . import persistence, resilience, singleflight
+from .data_source import BindData, SteamInfoData, ParentData, DisableParentData, PlayEvent
 from .steam import (
     get_steam_id,
     get_user_data,
     STEAM_ID_OFFSET,
-    get_steam_users_info,
     get_steam_users_info_cached,
+    steam_key_pool,
+    steam_user_cache,
+    profile_cache,
+    get_default_assets,
     STEAM_USER_CACHE_TTL
 )
 from .draw import (
@@ -76,6 +86,7 @@ steam enable
 steam disable
 steam update
 steam nickname <昵称>
+steam stats
 """.strip(),
     type="application",
     homepage="https://github.com/zhaomaoniu/nonebot-plugin-steam-info",
@@ -85,12 +96,15 @@ steam nickname <昵称>
 
 # ================= 配置 =================
 
-config = nonebot.get_plugin_config(Config)
 # 权限组合：管理员、群主或超级管理员
 BIND_PERMISSION = GROUP_ADMIN | GROUP_OWNER | SUPERUSER
 
 # ================= 数据 =================
 
+PILImage = lazy_import("PIL.Image")
+
+# 各数据文件在首次访问时才读取
+
 bind_data = BindData(store.get_data_file("nonebot_plugin_steam_info", "bind_data.json"))
 steam_info_data = SteamInfoData(
     store.get_data_file("nonebot_plugin_steam_info", "steam_info.json")
@@ -109,6 +123,35 @@ avatar_path = store.get_cache_dir("nonebot_plugin_steam_info")
 # except FileNotFoundError as e:
 #     logger.error(f"{e}，字体未配置，插件不可用")
 
+driver = nonebot.get_driver()
+
+# 按活跃度调整每个玩家的轮询间隔，总请求数受每分钟预算限制
+poller = AdaptivePoller(
+    config.steam_request_interval,
+    config.steam_poll_max_interval,
+    api_budget,
+)
+# 最近一次轮询的玩家摘要请求统计，命令触发的查询不计入
+last_poll_stats = FetchStats()
+
+@driver.on_startup
+async def _():
+    # 旧版本直接把 avatar_{steamid}.png 写在缓存目录下，改用 image_cache 后不再需要
+    for legacy in avatar_path.glob("avatar_*.png"):
+        legacy.unlink(missing_ok=True)
+    await image_cache.load()
+    # 预先读入默认图片，steam info 时不再读盘
+    try:
+        await asyncio.to_thread(get_default_assets)
+    except Exception as e:
+        logger.warning(f"读取 Steam 默认图片失败: {e}")
+
+@driver.on_shutdown
+async def _():
+    # 先保存数据（包括磁盘缓存索引），再关闭客户端
+    await persistence.flush_all()
+    await http_clients.aclose()
+
 # ================= Alconna 命令定义 =================
 
 steam_command = Alconna(
@@ -124,6 +167,7 @@ steam_command = Alconna(
     Option("disable", alias=["禁用"]),
     Option("update", alias=["更新群信息", "更新"]),
     Option("nickname", Args["name", str], alias=["昵称","备注"]),
+    Option("stats", alias=["统计"]),
     separators=" ",
     meta=CommandMeta(compact=True),
 )
@@ -145,10 +189,9 @@ async def to_image_data(image: Image) -> Union[BytesIO, bytes]:
     if image.path:
         return Path(image.path).read_bytes()
     if image.url:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(image.url)
-            resp.raise_for_status()
-            return resp.content
+        resp = await http_clients.get().get(image.url)
+        resp.raise_for_status()
+        return resp.content
     raise ValueError("无法获取图片")
 
 # ================= 命令实现 =================
@@ -156,6 +199,7 @@ async def to_image_data(image: Image) -> Union[BytesIO, bytes]:
 # 帮助菜单
 @steam_cmd.assign("help")
 async def _( ):
+    tracker.tag("help")
     await steam_cmd.finish(__plugin_meta__.usage)
 
 # 绑定Steam
@@ -166,6 +210,7 @@ async def handle_bind(
     target: MsgTarget,
     id: Match[str],
 ):    
+    tracker.tag("bind")
     await steam_cmd.send("收到指令，正在绑定…")   
     if not id.available or not id.result.isdigit():
         await steam_cmd.finish("请输入正确的 Steam ID 或好友码")
@@ -185,7 +230,7 @@ async def handle_bind(
     steam_name = "未知玩家"
     try:
         if config.steam_api_key:
-            info = await get_steam_users_info([steam_id], config.steam_api_key, config.proxy)
+            info = await get_steam_users_info_cached([steam_id], config.steam_api_key, config.proxy)
             players = info.get("response", {}).get("players", [])
             if players:
                 steam_name = players[0].get("personaname", steam_id)
@@ -194,18 +239,7 @@ async def handle_bind(
     except Exception as e:
         logger.error(f"获取 Steam 昵称失败: {e}")
 
-    existing_data = bind_data.get(parent_id, user_id)
-    if existing_data:
-        if isinstance(existing_data, dict):
-            existing_data["steam_id"] = steam_id
-        else:
-            existing_data.steam_id = steam_id
-    else:
-        bind_data.add(
-            parent_id,
-            {"user_id": user_id, "steam_id": steam_id, "nickname": None},
-        )
-
+    bind_data.bind(parent_id, user_id, steam_id)
     bind_data.save()
     
     await steam_cmd.finish(f"✅{qq_name}已绑定steam【{steam_name}】\nSteam ID：{steam_id}")
@@ -216,6 +250,7 @@ async def handle_unbind(
     bot: Bot,
     event: GroupMessageEvent,
 ):
+    tracker.tag("unbind")
     user_id = str(event.user_id)
     parent_id = str(event.group_id)
     if bind_data.get(parent_id, user_id):
@@ -233,6 +268,7 @@ async def handle_add_other(
     target: Match[At | str], 
     steam_id: Match[str]
 ):
+    tracker.tag("add")
     if not await (GROUP_ADMIN | GROUP_OWNER | SUPERUSER)(bot, event):
         await steam_cmd.finish("只有群管理员可以使用此功能。")
 
@@ -273,7 +309,7 @@ async def handle_add_other(
     try:
         if config.steam_api_key:
 
-            info = await get_steam_users_info([s_id], config.steam_api_key, config.proxy)
+            info = await get_steam_users_info_cached([s_id], config.steam_api_key, config.proxy)
             players = info.get("response", {}).get("players", [])
             if players:
                 steam_name = players[0].get("personaname", s_id)
@@ -282,16 +318,7 @@ async def handle_add_other(
     except Exception as e:
         logger.error(f"获取 Steam 昵称失败: {e}")
 
-    existing_data = bind_data.get(parent_id, target_qq)
-    if existing_data:
-
-        if isinstance(existing_data, dict):
-            existing_data["steam_id"] = s_id
-        else:
-            existing_data.steam_id = s_id
-    else:
-        bind_data.add(parent_id, {"user_id": target_qq, "steam_id": s_id, "nickname": None})
-    
+    bind_data.bind(parent_id, target_qq, s_id)
     bind_data.save()
     await steam_cmd.finish(f"为用户：{qq_name} ({target_qq})绑定Steam：成功\n{steam_name} ({s_id})")
 
@@ -302,6 +329,7 @@ async def handle_remove(
     event: GroupMessageEvent,
     target: Match[At | str]
 ):
+    tracker.tag("remove")
     parent_id = str(event.group_id)
 
     # --- 权限校验：必须是管理、群主或超管 ---
@@ -343,6 +371,7 @@ async def handle_remove(
 # 添加备注
 @steam_cmd.assign("nickname")
 async def _(target : MsgTarget, event: Event, name: Match[str]):
+    tracker.tag("nickname")
     if not name.available:
         await steam_cmd.finish("请输入昵称")
 
@@ -365,19 +394,19 @@ async def _(target : MsgTarget, event: Event, name: Match[str]):
 # 启用播报
 @steam_cmd.assign("enable")
 async def _(bot: Bot,event: GroupMessageEvent, target : MsgTarget):
+    tracker.tag("enable")
     if not await (GROUP_ADMIN | GROUP_OWNER | SUPERUSER)(bot, event):
         await steam_cmd.finish("只有群管理员可以使用此功能。")
     disable_parent_data.remove(target.parent_id or target.id)
-    disable_parent_data.save()
     await steam_cmd.finish("已启用 Steam 播报")
 
 # 禁用播报
 @steam_cmd.assign("disable")
 async def _(bot: Bot,event: GroupMessageEvent, target : MsgTarget):
+    tracker.tag("disable")
     if not await (GROUP_ADMIN | GROUP_OWNER | SUPERUSER)(bot, event):
         await steam_cmd.finish("只有群管理员可以使用此功能。")
     disable_parent_data.add(target.parent_id or target.id)
-    disable_parent_data.save()
     await steam_cmd.finish("已禁用 Steam 播报")
     
 # 更新主用户为群昵称与群头像    
@@ -386,6 +415,7 @@ async def update_parent_info_handle(
     bot: Bot,
     target : MsgTarget,
 ):
+    tracker.tag("update")
     parent_id = target.parent_id or target.id
 
     try:
@@ -394,10 +424,9 @@ async def update_parent_info_handle(
 
         # 群头像
         avatar_url = f"https://p.qlogo.cn/gh/{group_id}/{group_id}/640"
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(avatar_url)
-            resp.raise_for_status()
-            avatar = PILImage.open(BytesIO(resp.content))
+        resp = await http_clients.get().get(avatar_url)
+        resp.raise_for_status()
+        avatar = PILImage.open(BytesIO(resp.content))
 
         # 群名称
         name = group_info.get("group_name")
@@ -409,9 +438,40 @@ async def update_parent_info_handle(
     parent_data.update(parent_id, avatar, name)
     await steam_cmd.finish(f"更新成功，新名称为 {name}")
 
+# 运行统计（仅限超级管理员）
+@steam_cmd.assign("stats")
+async def _(bot: Bot, event: Event):
+    tracker.tag("stats")
+    if not await SUPERUSER(bot, event):
+        await steam_cmd.finish("只有超级管理员可以使用此功能。")
+
+    lines = [
+        "Steam 插件运行统计",
+        f"最近一次轮询：{last_poll_stats.summary()}",
+        "缓存：",
+        steam_user_cache.summary(),
+        profile_cache.summary(),
+        schema_cache.summary(),
+        *image_cache.report(),
+        *avatar_store.report(),
+        *app_asset_store.report(),
+        *asset_fetcher.report(),
+        *poller.report(),
+        "请求合并：",
+        *singleflight.report(),
+        "熔断器：",
+        *(resilience.report() or ["暂无请求"]),
+        "数据保存：",
+        *persistence.report(),
+        "API Key 用量：",
+        *steam_key_pool().report(),
+    ]
+    await steam_cmd.finish("\n".join(lines))
+
 # 查看Steam列表
 @steam_cmd.assign("check")
 async def _(target : MsgTarget):
+    tracker.tag("check")
     parent_id = target.parent_id or target.id
     steam_ids = bind_data.get_all(parent_id)
     
@@ -420,7 +480,7 @@ async def _(target : MsgTarget):
         
     await steam_cmd.send("收到指令，正在尝试读取…")
     try:
-        info = await get_steam_users_info(
+        info = await get_steam_users_info_cached(
             steam_ids, config.steam_api_key, config.proxy
         )
     except Exception as e:
@@ -431,7 +491,7 @@ async def _(target : MsgTarget):
         await steam_cmd.finish("未查找到玩家信息")
 
     tasks = [
-        simplize_steam_player_data(p, config.proxy, avatar_path) 
+        simplize_steam_player_data(p, config.proxy, avatar_store) 
         for p in info["response"]["players"]
     ]
     
@@ -447,9 +507,12 @@ async def _(target : MsgTarget):
         convert_player_name_to_nickname(res, parent_id, bind_data)
         for res in player_results
     ]
+    tracker.mark("db")
 
     image = draw_friends_status(parent_avatar, parent_name, data)
-    await target.send(UniMessage(Image(raw=image_to_bytes(image))))
+    image_bytes = image_to_bytes(image)
+    tracker.mark("render")
+    await target.send(UniMessage(Image(raw=image_bytes)))
 
 # 查看info
 @steam_cmd.assign("info")
@@ -458,6 +521,7 @@ async def handle_info(
     event: GroupMessageEvent,
     target: Match[At | str],
 ):
+    tracker.tag("info")
     parent_id = str(event.group_id)
     sender_id = str(event.user_id)
     
@@ -487,10 +551,11 @@ async def handle_info(
     await steam_cmd.send("收到指令，正在尝试读取…")
         
     try:
-        player_data = await get_user_data(steam_id, avatar_path, config.proxy)
+        player_data = await get_user_data(steam_id, config.proxy)
     except Exception as e:
         logger.error(f"获取玩家详情失败: {e}")
         await steam_cmd.finish("❌ 获取 Steam 数据失败，可能 API 超时或 ID 无效")
+    tracker.mark("db")
     steam_friend_code = str(int(steam_id) - STEAM_ID_OFFSET)
     draw_data = [
         {
@@ -517,76 +582,83 @@ async def handle_info(
     except Exception as e:
         logger.error(f"存在错误：{e}")
         await steam_cmd.finish("❌ 绘图失败，部分数据可能存在异常")
-        
-    await steam_cmd.finish(UniMessage(Image(raw=image_to_bytes(image))))
+
+    image_bytes = image_to_bytes(image)
+    tracker.mark("render")
+    await steam_cmd.finish(UniMessage(Image(raw=image_bytes)))
 
 # ================= 定时任务 =================
 
-async def update_steam_info():
-    bind_map = {
-        pid: bind_data.get_all(pid)
-        for pid in bind_data.content.keys()
-    }
+async def update_steam_info() -> Dict[str, List[PlayEvent]]:
+    """轮询到期的玩家，返回每个群需要播报的事件"""
+    steam_ids = bind_data.get_all_steam_id()
 
-    steam_ids = {
-        steam_id
-        for ids in bind_map.values()
-        for steam_id in ids
-    }
+    poller.sync(steam_ids)
+    due = poller.due()
+    if not due:
+        return {}
 
+    global last_poll_stats
+    stats = FetchStats()
     steam_info = await get_steam_users_info_cached(
-        list(steam_ids),
+        due,
         config.steam_api_key,
         config.proxy,
-        STEAM_USER_CACHE_TTL
+        STEAM_USER_CACHE_TTL,
+        stats=stats,
     )
+    last_poll_stats = stats
 
-    old = {
-        pid: steam_info_data.get_players(ids)
-        for pid, ids in bind_map.items()
-    }
+    players = steam_info["response"]["players"]
+    if not players:
+        return {}
 
-    if steam_info["response"]["players"]:
-        steam_info_data.update_by_players(
-            steam_info["response"]["players"]
-        )
-        steam_info_data.save()
+    poller.observe(players)
+    events = steam_info_data.update_by_players(players)
+    steam_info_data.retain(steam_ids)
+    steam_info_data.save()
 
-    return old
+    # 事件只计算一次，按绑定关系分发给各个群
+    by_parent: Dict[str, List[PlayEvent]] = {}
+    for event in events:
+        for pid in bind_data.get_parents(event.player["steamid"]):
+            by_parent.setdefault(pid, []).append(event)
+    return by_parent
 
 
-@scheduler.scheduled_job(
-    "interval", minutes=config.steam_request_interval / 60
-)
+@scheduler.scheduled_job("interval", seconds=POLL_TICK)
+async def _():
+    by_parent = await update_steam_info()
+    for pid, events in by_parent.items():
+        await broadcast_steam_info(pid, events)
+
+@scheduler.scheduled_job("interval", seconds=config.steam_disk_cache_sweep_interval)
 async def _():
-    old = await update_steam_info()
-    for pid, old_players in old.items():
-        new_players = steam_info_data.get_players(bind_data.get_all(pid))
-        await broadcast_steam_info(pid, old_players, new_players)
+    removed = await image_cache.sweep()
+    if removed:
+        logger.debug(f"清理过期的 Steam 磁盘缓存 {removed} 个")
 
 async def broadcast_steam_info(
     parent_id: str,
-    old_players: List[ProcessedPlayer],
-    new_players: List[ProcessedPlayer],
+    play_data: List[PlayEvent],
 ):
     if disable_parent_data.is_disabled(parent_id):
         return None
 
     bot = nonebot.get_bot()
-    play_data = steam_info_data.compare(old_players, new_players)
 
     msg = []
 
     for entry in play_data:
-        player = entry["player"]
-        old_player = entry.get("old_player")
+        player = entry.player
+        old_player = entry.old_player
 
-        if entry["type"] == "start":
+        if entry.type == "start":
             msg.append(
                 f"{player['personaname']} 开始玩 {player['gameextrainfo']} 了"
             )
 
-        elif entry["type"] in ("stop", "change"):
+        elif entry.type in ("stop", "change"):
             time_start = old_player["game_start_time"]
             time_stop = time.time()
             hours = int((time_stop - time_start) / 3600)
@@ -598,7 +670,7 @@ async def broadcast_steam_info(
                 else f"{minutes} 分钟"
             )
 
-            if entry["type"] == "change":
+            if entry.type == "change":
                 msg.append(
                     f"{player['personaname']} 玩了 {time_str} "
                     f"{old_player['gameextrainfo']} 后，开始玩 "
@@ -619,23 +691,23 @@ async def broadcast_steam_info(
         images = []
 
         for entry in play_data:
-            if entry["type"] not in ("start", "change"):
+            if entry.type not in ("start", "change"):
                 continue
 
-            steamid = entry["player"]["steamid"]
+            steamid = entry.player["steamid"]
 
             if steamid in avatar_cache:
                 avatar = avatar_cache[steamid]
             else:
                 avatar = await fetch_avatar(
-                    entry["player"], avatar_path, config.proxy
+                    entry.player, avatar_store, config.proxy, size=66
                 )
                 avatar_cache[steamid] = avatar
 
             img = draw_start_gaming(
                 avatar,
-                entry["player"]["personaname"],
-                entry["player"]["gameextrainfo"],
+                entry.player["personaname"],
+                entry.player["gameextrainfo"],
                 bind_data.get_by_steam_id(
                     parent_id, steamid
                 )["nickname"],
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from nonebot.log import logger
+
+from ..madoka_bundle.cache import TTLCache
+from ..madoka_bundle.lazy import lazy_import
+from .client import http_clients
+from .config import config
+from .constants import default_achievement_image_path, default_header_image_path
+from .disk_cache import DiskCache, image_cache
+from .resilience import guarded_get
+from .singleflight import get_flight
+
+Image = lazy_import("PIL.Image")
+
+# 与 draw.py 中 draw_game_info 的绘制尺寸一致
+ASSET_SIZES: Dict[str, Tuple[int, int]] = {
+    "header": (229, 86),
+    "achievement": (48, 48),
+}
+DEFAULT_PATHS = {
+    "header": default_header_image_path,
+    "achievement": default_achievement_image_path,
+}
+FAILURE_TTL = 300  # 下载或解码失败的图片在这段时间内直接使用默认图片（秒）
+
+
+def _image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+def _resize(content: bytes, size: Tuple[int, int]) -> bytes:
+    buffer = BytesIO()
+    image = Image.open(BytesIO(content)).convert("RGB")
+    image.resize(size, Image.BICUBIC).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _decode(content: bytes) -> Image.Image:
+    image = Image.open(BytesIO(content))
+    image.load()
+    return image
+
+
+class AppAssetStore:
+    """
+    按 appid 缓存游戏头图与成就图标
+    - 下载后立即缩放到绘制尺寸（头图 229x86，成就 48x48），只把缩略图写入磁盘缓存
+    - 以 (appid, URL) 作为版本，URL 变化即视为新图片
+    - 解码后的图片保存在按字节数限制的内存 LRU 中，绘图时直接使用，不再下载与解码
+    - 磁盘读写、缩放与解码都在线程中进行
+    - 下载或解码失败的图片记录 FAILURE_TTL 秒，期间直接返回默认图片，不再重复请求
+    - 返回的图片为共享对象，调用方只能读取（paste / resize 等会生成新图片的操作）
+    """
+
+    def __init__(self, disk: DiskCache, memory_bytes: int, memory_size: int = 4096):
+        self.disk = disk
+        self._images: TTLCache[Tuple[str, str, str], Image.Image] = TTLCache(
+            maxsize=memory_size,
+            max_bytes=memory_bytes,
+            sizeof=_image_bytes,
+            name="游戏图片内存缓存",
+        )
+        self._failures: TTLCache[Tuple[str, str], bool] = TTLCache(
+            maxsize=memory_size, ttl=FAILURE_TTL, name="游戏图片失败记录"
+        )
+        self._defaults: Dict[str, Image.Image] = {}
+        self._flight = get_flight("游戏图片")
+        self.downloads = 0
+        self.decodes = 0
+
+    @staticmethod
+    def _disk_key(kind: str, app_id: Optional[str], url: str) -> str:
+        return f"{app_id or '-'}:{kind}:{url}"
+
+    def default(self, kind: str) -> Image.Image:
+        image = self._defaults.get(kind)
+        if image is None:
+            content = _resize(DEFAULT_PATHS[kind].read_bytes(), ASSET_SIZES[kind])
+            image = self._defaults[kind] = _decode(content)
+        return image
+
+    async def _download(self, url: str, proxy: Optional[str]) -> Optional[bytes]:
+        try:
+            response = await guarded_get(http_clients.get(proxy), url)
+            if response.status_code == 200:
+                self.downloads += 1
+                return response.content
+            logger.warning(f"下载游戏图片失败: {url}, 状态码: {response.status_code}")
+        except Exception as e:
+            logger.warning(f"下载游戏图片异常: {url}, 错误: {e}")
+        return None
+
+    async def _load(
+        self, kind: str, app_id: Optional[str], url: str, proxy: Optional[str]
+    ) -> Optional[Image.Image]:
+        disk_key = self._disk_key(kind, app_id, url)
+        content = await self.disk.get(kind, disk_key)
+        if content is None:
+            raw = await self._download(url, proxy)
+            if raw is None:
+                self._failures.set((kind, url), True)
+                return None
+            try:
+                content = await asyncio.to_thread(_resize, raw, ASSET_SIZES[kind])
+            except Exception as e:
+                logger.warning(f"游戏图片解码失败: {url}, 错误: {e}")
+                self._failures.set((kind, url), True)
+                return None
+            await self.disk.put(kind, disk_key, content)
+        try:
+            image = await asyncio.to_thread(_decode, content)
+        except Exception as e:
+            logger.warning(f"游戏图片缓存损坏: {url}, 错误: {e}")
+            await self.disk.delete(disk_key)
+            self._failures.set((kind, url), True)
+            return None
+        self.decodes += 1
+        self._images.set((kind, app_id or "", url), image)
+        return image
+
+    async def get(
+        self, kind: str, app_id: Optional[str], url: Optional[str], proxy: Optional[str] = None
+    ) -> Image.Image:
+        """kind 为 header 或 achievement；取不到时返回同尺寸的默认图片"""
+        if not url or self._failures.get((kind, url)):
+            return self.default(kind)
+        image = self._images.get((kind, app_id or "", url))
+        if image is None:
+            # 同一图片的并发请求只下载、缩放一次
+            image = await self._flight.do(
+                (kind, url, proxy), lambda: self._load(kind, app_id, url, proxy)
+            )
+        return image if image is not None else self.default(kind)
+
+    async def header(
+        self, app_id: Optional[str], url: Optional[str], proxy: Optional[str] = None
+    ) -> Image.Image:
+        return await self.get("header", app_id, url, proxy)
+
+    async def achievement(
+        self, app_id: Optional[str], url: Optional[str], proxy: Optional[str] = None
+    ) -> Image.Image:
+        return await self.get("achievement", app_id, url, proxy)
+
+    def report(self) -> List[str]:
+        return [
+            f"游戏图片: 下载 {self.downloads} 次，解码 {self.decodes} 次",
+            self._images.summary(),
+            self._failures.summary(),
+        ]
+
+
+app_asset_store = AppAssetStore(image_cache, config.steam_app_asset_memory)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from nonebot.log import logger
+
+from ..madoka_bundle.cache import TTLCache
+from ..madoka_bundle.lazy import lazy_import
+from .constants import unknown_avatar_path
+from .disk_cache import DiskCache, image_cache
+from .models import Player
+from .resilience import guarded_get
+from .singleflight import get_flight
+from .steam import get_http_client
+
+Image = lazy_import("PIL.Image")
+
+# 预先生成的缩略图尺寸，与 draw.py 中的头像尺寸一致
+# 50: 好友列表 / 66: 开始游戏播报（群头像来自 QQ，不经过这里）
+AVATAR_VARIANTS = (50, 66)
+AVATAR_HASH_PATTERN = re.compile(r"/([0-9a-f]{40})(?:_medium|_full)?\.\w+$")
+
+_avatar_flight = get_flight("头像")
+
+
+async def download_avatar(avatar_url: str, proxy: str = None) -> Optional[bytes]:
+    client = await get_http_client(proxy)
+    try:
+        response = await guarded_get(client, avatar_url)
+        if response.status_code == 200:
+            return response.content
+        else:
+            logger.warning(f"下载头像失败，状态码: {response.status_code}")
+    except Exception as e:
+        logger.warning(f"下载头像异常: {avatar_url}, 错误: {e}")
+    return None
+
+
+class AvatarStore:
+    """
+    按 avatarhash 缓存头像
+    - 记录 steamid -> avatarhash，只有 hash 变化时才重新下载
+    - hash 对应的内容不会变，原图和各尺寸缩略图都写入磁盘缓存
+    - 解码后的图片保存在内存 LRU 中，取出时返回副本
+    """
+
+    def __init__(
+        self,
+        disk: DiskCache,
+        sizes: Tuple[int, ...] = AVATAR_VARIANTS,
+        memory_size: int = 1024,
+    ):
+        self.disk = disk
+        self.sizes = sizes
+        self._hashes: Dict[str, str] = {}
+        self._images: TTLCache[Tuple[str, int], Image.Image] = TTLCache(
+            maxsize=memory_size, name="头像内存缓存"
+        )
+        self.downloads = 0
+
+    def avatar_hash(self, player: Player) -> Optional[str]:
+        """优先使用 avatarhash，其次从头像 URL 中解析，最后使用之前记录的 hash"""
+        steamid = player.get("steamid")
+        avatar_hash = player.get("avatarhash")
+        if not avatar_hash:
+            url = player.get("avatarfull") or player.get("avatar") or ""
+            match = AVATAR_HASH_PATTERN.search(url)
+            avatar_hash = match.group(1) if match else self._hashes.get(steamid)
+        if avatar_hash and steamid:
+            self._hashes[steamid] = avatar_hash
+        return avatar_hash
+
+    @staticmethod
+    def _disk_key(avatar_hash: str, size: int) -> str:
+        return f"{avatar_hash}:{size or 'full'}"
+
+    @staticmethod
+    def _variants(content: bytes, sizes: List[int]) -> Dict[int, bytes]:
+        """解码并缩放，在线程中执行"""
+        image = Image.open(BytesIO(content)).convert("RGB")
+        variants = {}
+        for size in sizes:
+            buffer = BytesIO()
+            image.resize((size, size), Image.BICUBIC).save(buffer, format="PNG")
+            variants[size] = buffer.getvalue()
+        return variants
+
+    async def _fetch(self, avatar_hash: str, url: str, proxy: Optional[str]) -> bool:
+        """保证原图与缩略图都已写入磁盘缓存，已有的尺寸不再重新生成"""
+        full_key = self._disk_key(avatar_hash, 0)
+        full = await self.disk.get("avatar", full_key)
+        if full is None:
+            full = await download_avatar(url, proxy)
+            if full is None:
+                return False
+            self.downloads += 1
+            await self.disk.put("avatar", full_key, full)
+
+        missing = [
+            size for size in self.sizes
+            if not self.disk.has("avatar", self._disk_key(avatar_hash, size))
+        ]
+        if not missing:
+            return True
+        try:
+            variants = await asyncio.to_thread(self._variants, full, missing)
+        except Exception as e:
+            logger.warning(f"头像解码失败: {url}, 错误: {e}")
+            return False
+        for size, data in variants.items():
+            await self.disk.put("avatar", self._disk_key(avatar_hash, size), data)
+        return True
+
+    async def get(
+        self, player: Player, proxy: str = None, size: Optional[int] = None
+    ) -> Image.Image:
+        url = player.get("avatarfull") or player.get("avatar")
+        if not url:
+            logger.warning(f"玩家 {player.get('steamid')} 缺少头像 URL")
+            return Image.open(unknown_avatar_path)
+
+        avatar_hash = self.avatar_hash(player)
+        if avatar_hash is None:
+            content = await _avatar_flight.do((url, proxy), lambda: download_avatar(url, proxy))
+            return Image.open(BytesIO(content) if content else unknown_avatar_path)
+
+        size = size if size in self.sizes else 0
+        key = (avatar_hash, size)
+        image = self._images.get(key)
+        if image is not None:
+            return image.copy()
+
+        content = await self.disk.get("avatar", self._disk_key(avatar_hash, size))
+        if content is None:
+            # 同一头像的并发请求只下载、缩放一次
+            stored = await _avatar_flight.do(
+                (avatar_hash, proxy), lambda: self._fetch(avatar_hash, url, proxy)
+            )
+            content = stored and await self.disk.get("avatar", self._disk_key(avatar_hash, size))
+            if not content:
+                return Image.open(unknown_avatar_path)
+
+        image = Image.open(BytesIO(content))
+        image.load()
+        self._images.set(key, image)
+        return image.copy()
+
+    def report(self) -> List[str]:
+        return [
+            f"头像: 记录 {len(self._hashes)} 个玩家，下载 {self.downloads} 次",
+            self._images.summary(),
+        ]
+
+
+avatar_store = AvatarStore(image_cache)
@@ -0,0 +1,62 @@
+import importlib.util
+from typing import Dict, Optional
+
+import httpx
+from nonebot.log import logger
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_TIMEOUT = httpx.Timeout(connect=10.0, read=15.0, write=10.0, pool=5.0)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=60.0,
+)
+DEFAULT_HEADERS = {"User-Agent": "MadokaBot/SteamInfo"}
+
+
+class HttpClientManager:
+    """
+    按代理地址复用 httpx.AsyncClient
+    - 客户端创建是同步的，不需要加锁；命中时只是一次字典查找
+    - 安装了 h2 时启用 HTTP/2
+    """
+
+    def __init__(
+        self,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self._timeout = timeout
+        self._limits = limits
+        self._headers = headers or DEFAULT_HEADERS
+        self._clients: Dict[Optional[str], httpx.AsyncClient] = {}
+
+    def get(self, proxy: Optional[str] = None) -> httpx.AsyncClient:
+        client = self._clients.get(proxy)
+        if client is not None and not client.is_closed:
+            return client
+
+        client = httpx.AsyncClient(
+            proxy=proxy,
+            timeout=self._timeout,
+            limits=self._limits,
+            headers=self._headers,
+            follow_redirects=True,
+            http2=HTTP2_AVAILABLE,
+        )
+        self._clients[proxy] = client
+        logger.debug(f"Steam HTTP client initialized (proxy={proxy}, http2={HTTP2_AVAILABLE})")
+        return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端失败: {e}")
+
+
+http_clients = HttpClientManager()
@@ -1,17 +1,56 @@
-from typing import Optional, Union, List
+from typing import Dict, Optional, Union, List
+from nonebot import get_plugin_config
 from pydantic import BaseModel, validator
 
 
 class Config(BaseModel):
     steam_api_key: Union[str, List[str]]
     proxy: Optional[str] = None
-    steam_request_interval: int = 60  # seconds
+    steam_api_base_url: str = "https://api.steampowered.com"  # 离线测试时可指向 tools/fake_steam_server.py
+    steam_community_base_url: str = "https://steamcommunity.com"
+    steam_cdn_base_url: str = "https://cdn.cloudflare.steamstatic.com"  # 游戏头图
+    steam_request_interval: int = 60  # seconds，游戏中玩家的轮询间隔
+    steam_poll_max_interval: int = 1800  # 长期离线玩家的轮询间隔（秒）
+    steam_poll_budget: int = 60  # Steam Web API 每分钟请求预算，命令与重试也计入，轮询只用剩余部分
     steam_broadcast_type: str = "part"  # all, part, none
     steam_disable_broadcast_on_startup: bool = False
     steam_command_priority: int = 10
+    steam_api_rate_limit: float = 2.0  # 每秒请求数（令牌桶速率）
+    steam_api_burst: int = 4  # 令牌桶容量
+    steam_api_concurrency: int = 4  # 同时进行的 API 请求数
+    steam_api_retries: int = 2  # 单批失败后的重试次数
+    steam_api_workers: int = 4  # 查询最近游戏成就时同时处理的游戏数（所有玩家合计）
+    steam_schema_cache_ttl: int = 86400  # 游戏成就表缓存时长（秒）
+    steam_retry_backoff_base: float = 0.5  # 重试退避基数（秒），按 2^n 增长并加随机抖动
+    steam_retry_backoff_max: float = 8.0  # 单次退避上限（秒）
+    steam_breaker_threshold: int = 5  # 同一主机连续失败多少次后熔断
+    steam_breaker_reset: int = 30  # 熔断后多久放行一次试探请求（秒）
+    steam_api_key_strategy: str = "round_robin"  # round_robin, least_used
+    steam_api_daily_limit: int = 100000  # 单个 Key 每日调用上限
+    steam_api_key_quarantine: int = 300  # 被限流的 Key 隔离时长（秒）
+    steam_player_cache_ttl: int = 30  # 玩家摘要缓存时长（秒）
+    steam_profile_cache_ttl: int = 300  # 玩家详情（steam info）缓存时长（秒）
+    steam_profile_cache_stale: int = 3600  # 过期后仍可先返回旧数据并后台刷新的时长（秒）
+    steam_profile_cache_memory: int = 64 * 1024 * 1024  # 玩家详情缓存的内存上限（字节，含背景与头像）
+    steam_save_delay: float = 2.0  # 绑定、状态等数据修改后延迟多久合并写盘（秒）
+    steam_disk_cache_size: int = 256 * 1024 * 1024  # 图片磁盘缓存上限（字节）
+    steam_disk_cache_ttl: Dict[str, int] = {  # 各类图片的缓存时长（秒）
+        "avatar": 30 * 86400,  # 按 avatarhash 存储，内容不会变
+        "header": 7 * 86400,
+        "achievement": 30 * 86400,
+        "background": 3 * 86400,
+        "profile": 300,
+    }
+    steam_app_asset_memory: int = 32 * 1024 * 1024  # 解码后的游戏头图与成就图标内存上限（字节）
+    steam_disk_cache_stale: int = 86400  # 过期后仍可先返回旧内容并后台重新验证的时长（秒）
+    steam_disk_cache_flush_delay: float = 30.0  # 磁盘缓存索引修改后延迟多久合并写盘（秒）
+    steam_disk_cache_sweep_interval: int = 3600  # 定期清理过期磁盘缓存的间隔（秒）
 
     @validator("steam_api_key", pre=True)
     def ensure_list(cls, v):
         if isinstance(v, str):
             return [v]
         return v
+
+
+config = get_plugin_config(Config)
@@ -1,221 +1,274 @@
+from __future__ import annotations
+
 import json
 import time
-from PIL import Image
+from abc import abstractmethod
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, List, Dict, Optional, Tuple
+from typing import Any, Iterable, List, Dict, Literal, Optional, Tuple
 
+from ..madoka_bundle.lazy import lazy_import
+from .config import config
+from .persistence import WriteBehind
 from .models import Player, ProcessedPlayer
 from .constants import *
 
+Image = lazy_import("PIL.Image")
+
+
+class JsonStore(WriteBehind):
+    """
+    JSON 文件存储基类，首次访问 content 时才读取文件
+    save() 后延迟 steam_save_delay 秒合并写盘，见 persistence.WriteBehind
+    """
+
+    def __init__(self, save_path: Path, delay: float = config.steam_save_delay) -> None:
+        super().__init__(save_path, save_path.name, delay)
+        self._content: Any = None
+
+    @abstractmethod
+    def _default(self) -> Any:
+        """文件不存在或内容无效时使用的初始数据"""
+
+    def _parse(self, raw: Any) -> Any:
+        """校验读取到的数据，需要重写文件时返回 None"""
+        return raw
+
+    def _load(self) -> Any:
+        if self._save_path.exists():
+            content = self._parse(json.loads(self._save_path.read_text("utf-8")))
+            if content is not None:
+                return content
+        self._save_path.parent.mkdir(parents=True, exist_ok=True)
+        self._content = self._default()
+        self.save()
+        return self._content
+
+    @property
+    def content(self) -> Any:
+        if self._content is None:
+            self._content = self._load()
+        return self._content
+
+    @content.setter
+    def content(self, value: Any) -> None:
+        self._content = value
+
+    def _serialize(self) -> Any:
+        """写入文件的数据，内存中的结构与文件格式不同时重写"""
+        return self.content
+
+
+class BindData(JsonStore):
+    """
+    绑定数据，文件格式为 parent_id -> [{user_id, steam_id, nickname}]
+    内存中另外维护三个索引，所有修改都要经过这里的方法：
+    - parent_id -> user_id -> 绑定
+    - parent_id -> steam_id -> 绑定（同一 steam_id 被多人绑定时按绑定顺序排列）
+    - steam_id -> 绑定了它的 parent_id
+    直接替换 content 后索引会在下次访问时重建
+    """
+
+    content: Dict[str, List[Dict[str, str]]]
 
-class BindData:
     def __init__(self, save_path: Path) -> None:
-        self.content: Dict[str, List[Dict[str, str]]] = {}
-        self._save_path = save_path
+        super().__init__(save_path)
+        self._indexed: Any = None  # 建立索引时的 content
+        self._by_user: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self._by_steam: Dict[str, Dict[str, List[Dict[str, str]]]] = {}
+        self._parents: Dict[str, Dict[str, None]] = {}  # 用 dict 保持插入顺序
 
-        if save_path.exists():
-            self.content = json.loads(Path(save_path).read_text("utf-8"))
-        else:
-            self.save()
+    def _default(self) -> Dict[str, List[Dict[str, str]]]:
+        return {}
+
+    # ---------- 索引 ----------
+
+    def _index(self) -> None:
+        if self._indexed is self.content:
+            return
+        self._by_user, self._by_steam, self._parents = {}, {}, {}
+        for parent_id, binds in self.content.items():
+            for data in binds:
+                self._index_add(parent_id, data)
+        self._indexed = self.content
+
+    def _index_add(self, parent_id: str, data: Dict[str, str]) -> None:
+        self._by_user.setdefault(parent_id, {}).setdefault(data["user_id"], data)
+        self._by_steam.setdefault(parent_id, {}).setdefault(data["steam_id"], []).append(data)
+        self._parents.setdefault(data["steam_id"], {})[parent_id] = None
+
+    def _index_remove(self, parent_id: str, data: Dict[str, str]) -> None:
+        users = self._by_user.get(parent_id, {})
+        if users.get(data["user_id"]) is data:
+            del users[data["user_id"]]
+        steam_ids = self._by_steam.get(parent_id, {})
+        binds = steam_ids.get(data["steam_id"], [])
+        for idx, bind in enumerate(binds):
+            if bind is data:
+                del binds[idx]
+                break
+        if not binds:
+            steam_ids.pop(data["steam_id"], None)
+            parents = self._parents.get(data["steam_id"], {})
+            parents.pop(parent_id, None)
+            if not parents:
+                self._parents.pop(data["steam_id"], None)
+
+    @staticmethod
+    def _normalize(data: Dict[str, str]) -> Dict[str, str]:
+        if not data.get("nickname"):
+            data["nickname"] = None
+        return data
 
-    def save(self) -> None:
-        with open(self._save_path, "w", encoding="utf-8") as f:
-            json.dump(self.content, f, indent=4)
+    # ---------- 修改 ----------
 
     def add(self, parent_id: str, content: Dict[str, str]) -> None:
-        if parent_id not in self.content:
-            self.content[parent_id] = [content]
-        else:
-            self.content[parent_id].append(content)
+        self._index()
+        self.content.setdefault(parent_id, []).append(content)
+        self._index_add(parent_id, content)
+
+    def bind(self, parent_id: str, user_id: str, steam_id: str) -> None:
+        """绑定或换绑，换绑时保留备注"""
+        self._index()
+        data = self._by_user.get(parent_id, {}).get(user_id)
+        if data is None:
+            self.add(parent_id, {"user_id": user_id, "steam_id": steam_id, "nickname": None})
+        elif data["steam_id"] != steam_id:
+            self._index_remove(parent_id, data)
+            data["steam_id"] = steam_id
+            self._index_add(parent_id, data)
 
     def remove(self, parent_id: str, user_id: str) -> None:
-        if parent_id not in self.content:
+        self._index()
+        data = self._by_user.get(parent_id, {}).get(user_id)
+        if data is None:
             return
-        for data in self.content[parent_id]:
-            if data["user_id"] == user_id:
-                self.content[parent_id].remove(data)
+        binds = self.content[parent_id]
+        for idx, bind in enumerate(binds):
+            if bind is data:
+                del binds[idx]
+                break
+        self._index_remove(parent_id, data)
+        # 同一用户可能有重复的旧记录，补上索引
+        for bind in binds:
+            if bind["user_id"] == user_id:
+                self._by_user[parent_id][user_id] = bind
                 break
 
-    def update(self, parent_id: str, content: Dict[str, str]) -> None:
+    def update(self, parent_id: str, content: List[Dict[str, str]]) -> None:
+        self._index()
+        for data in self.content.get(parent_id, []):
+            self._index_remove(parent_id, data)
         self.content[parent_id] = content
+        for data in content:
+            self._index_add(parent_id, data)
+
+    # ---------- 查询 ----------
 
     def get(self, parent_id: str, user_id: str) -> Optional[Dict[str, str]]:
-        if parent_id not in self.content:
-            return None
-        for data in self.content[parent_id]:
-            if data["user_id"] == user_id:
-                if not data.get("nickname"):
-                    data["nickname"] = None
-                return data
-        return None
+        self._index()
+        data = self._by_user.get(parent_id, {}).get(user_id)
+        return None if data is None else self._normalize(data)
 
     def get_by_steam_id(
         self, parent_id: str, steam_id: str
     ) -> Optional[Dict[str, str]]:
-        if parent_id not in self.content:
-            return None
-        for data in self.content[parent_id]:
-            if data["steam_id"] == steam_id:
-                if not data.get("nickname"):
-                    data["nickname"] = None
-                return data
-        return None
+        self._index()
+        binds = self._by_steam.get(parent_id, {}).get(steam_id)
+        return self._normalize(binds[0]) if binds else None
 
     def get_all(self, parent_id: str) -> List[str]:
-        if parent_id not in self.content:
-            return []
+        self._index()
+        return list(self._by_steam.get(parent_id, {}))
 
-        result = []
+    def get_all_steam_id(self) -> List[str]:
+        self._index()
+        return list(self._parents)
 
-        for data in self.content[parent_id]:
-            if not data["steam_id"] in result:
-                result.append(data["steam_id"])
+    def get_parents(self, steam_id: str) -> List[str]:
+        """绑定了该 steam_id 的所有 parent_id"""
+        self._index()
+        return list(self._parents.get(steam_id, {}))
 
-        return result
 
-    def get_all_steam_id(self) -> List[str]:
-        result = []
-        for parent_id in self.content:
-            for data in self.content[parent_id]:
-                if not data["steam_id"] in result:
-                    result.append(data["steam_id"])
-        return result
+@dataclass(frozen=True)
+class PlayEvent:
+    """两次轮询之间玩家游戏状态的变化，同一个事件会分发给绑定了该玩家的所有群"""
 
+    type: Literal["start", "stop", "change"]
+    player: ProcessedPlayer
+    old_player: ProcessedPlayer
 
-class SteamInfoData:
-    def __init__(self, save_path: Path) -> None:
-        self.content: List[ProcessedPlayer] = []
-        self._save_path = save_path
-
-        if save_path.exists():
-            self.content = json.loads(save_path.read_text("utf-8"))
-            if isinstance(self.content, dict):
-                self.content = []
-                self.save()
-        else:
-            self.save()
 
-    def save(self) -> None:
-        with open(self._save_path, "w", encoding="utf-8") as f:
-            json.dump(self.content, f, indent=4)
+def play_event(old_player: ProcessedPlayer, player: ProcessedPlayer) -> Optional[PlayEvent]:
+    game, old_game = player.get("gameextrainfo"), old_player.get("gameextrainfo")
+    if game == old_game:
+        return None
+    if game is not None and old_game is not None:
+        return PlayEvent("change", player, old_player)
+    if old_game is not None:
+        return PlayEvent("stop", player, old_player)
+    return PlayEvent("start", player, old_player)
+
 
-    def update(self, player: ProcessedPlayer) -> None:
-        self.content.append(player)
+class SteamInfoData(JsonStore):
+    """上一次轮询到的玩家状态，内存中按 steamid 索引，文件中仍为列表"""
+
+    content: Dict[str, ProcessedPlayer]
 
-    def update_by_players(self, players: List[Player]):
-        processed_players = []
+    def _default(self) -> Dict[str, ProcessedPlayer]:
+        return {}
+
+    def _parse(self, raw: Any) -> Optional[Dict[str, ProcessedPlayer]]:
+        # 旧版本为 dict 格式，直接重置
+        if isinstance(raw, dict):
+            return None
+        return {player["steamid"]: player for player in raw}
+
+    def _serialize(self) -> Any:
+        return list(self.content.values())
+
+    def update(self, player: ProcessedPlayer) -> None:
+        self.content[player["steamid"]] = player
+
+    def update_by_players(self, players: List[Player]) -> List[PlayEvent]:
+        """
+        写入本次轮询到的玩家（其余玩家保持不变），同时算出游戏状态的变化
+        第一次出现的玩家只记录状态，不产生事件
+        """
+        now = int(time.time())
+        events: List[PlayEvent] = []
         for player in players:
-            old_player = self.get_player(player["steamid"])
-
-            if old_player is None:
-                if player.get("gameextrainfo") is not None:
-                    player["game_start_time"] = int(time.time())
-                else:
-                    player["game_start_time"] = None
-                processed_players.append(player)
+            old_player = self.content.get(player["steamid"])
+            game = player.get("gameextrainfo")
+            if game is None:
+                player["game_start_time"] = None
+            elif old_player is None or old_player.get("gameextrainfo") != game:
+                # 开始或切换游戏
+                player["game_start_time"] = now
             else:
-                if (
-                    player.get("gameextrainfo") is not None
-                    and old_player.get("gameextrainfo") is None
-                ):
-                    # 开始游戏
-                    player["game_start_time"] = int(time.time())
-                elif (
-                    player.get("gameextrainfo") is None
-                    and old_player.get("gameextrainfo") is not None
-                ):
-                    # 结束游戏
-                    player["game_start_time"] = None
-                elif (
-                    player.get("gameextrainfo") is not None
-                    and old_player.get("gameextrainfo") is not None
-                ):
-                    if player.get("gameextrainfo") != old_player.get("gameextrainfo"):
-                        # 切换游戏
-                        player["game_start_time"] = int(time.time())
-                    else:
-                        # 继续游戏
-                        player["game_start_time"] = old_player["game_start_time"]
-                else:
-                    player["game_start_time"] = None
-                processed_players.append(player)
-
-        self.content = processed_players
-
-    def get_player(self, steam_id: str) -> Optional[Player]:
-        for player in self.content:
-            if player["steamid"] == steam_id:
-                return player
-        return None
+                # 继续游戏
+                player["game_start_time"] = old_player.get("game_start_time")
 
-    def get_players(self, steam_ids: List[str]) -> List[Player]:
-        result = []
-        for player in self.content:
-            if player["steamid"] in steam_ids:
-                result.append(player)
-        return result
-
-    def compare(
-        self, old_players: List[Player], new_players: List[Player]
-    ) -> List[Dict[str, Any]]:
-        result = []
-
-        for player in new_players:
-            for old_player in old_players:
-                if player["steamid"] == old_player["steamid"]:
-                    if player.get("gameextrainfo") != old_player.get("gameextrainfo"):
-                        if (
-                            player.get("gameextrainfo") is not None
-                            and old_player.get("gameextrainfo") is not None
-                        ):
-                            result.append(
-                                {
-                                    "type": "change",
-                                    "player": player,
-                                    "old_player": old_player,
-                                }
-                            )
-                        elif old_player.get("gameextrainfo") is not None:
-                            result.append(
-                                {
-                                    "type": "stop",
-                                    "player": player,
-                                    "old_player": old_player,
-                                }
-                            )
-                        elif player.get("gameextrainfo") is not None :
-                            result.append(
-                                {
-                                    "type": "start",
-                                    "player": player,
-                                    "old_player": old_player,
-                                }
-                            )
-                        else:
-                            result.append(
-                                {
-                                    "type": "error",
-                                    "player": player,
-                                    "old_player": old_player,
-                                }
-                            )
-        return result
-
-
-class ParentData:
-    def __init__(self, save_path: Path) -> None:
-        self.content: Dict[str, str] = {}  # parent_id: name
-        self._save_path = save_path
+            if old_player is not None:
+                event = play_event(old_player, player)
+                if event is not None:
+                    events.append(event)
+            self.content[player["steamid"]] = player
+        return events
 
-        if not save_path.exists():
-            save_path.parent.mkdir(parents=True, exist_ok=True)
-            self.save()
-        else:
-            self.content = json.loads(save_path.read_text("utf-8"))
+    def retain(self, steam_ids: Iterable[str]) -> None:
+        """移除已经没有绑定的玩家"""
+        steam_ids = set(steam_ids)
+        for steam_id in [s for s in self.content if s not in steam_ids]:
+            del self.content[steam_id]
+
+
+class ParentData(JsonStore):
+    content: Dict[str, str]  # parent_id: name
 
-    def save(self) -> None:
-        with open(self._save_path, "w", encoding="utf-8") as f:
-            json.dump(self.content, f, indent=4)
+    def _default(self) -> Dict[str, str]:
+        return {}
 
     def update(self, parent_id: str, avatar: Image.Image, name: str) -> None:
         self.content[parent_id] = name
@@ -233,21 +286,13 @@ class ParentData:
         return Image.open(avatar_path), self.content[parent_id]
 
 
-class DisableParentData:
+class DisableParentData(JsonStore):
     """储存禁用 Steam 通知的 parent"""
 
-    def __init__(self, save_path: Path) -> None:
-        self.content: List[str] = []
-        self._save_path = save_path
-
-        if save_path.exists():
-            self.content = json.loads(save_path.read_text("utf-8"))
-        else:
-            self.save()
+    content: List[str]
 
-    def save(self) -> None:
-        with open(self._save_path, "w", encoding="utf-8") as f:
-            json.dump(self.content, f, indent=4)
+    def _default(self) -> List[str]:
+        return []
 
     def add(self, parent_id: str) -> None:
         if parent_id not in self.content:
@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import nonebot_plugin_localstore as store
+from nonebot.log import logger
+
+from ..madoka_bundle.cache import CacheStats
+from .config import config
+from .persistence import WriteBehind, atomic_write
+
+DEFAULT_TTL = 86400
+INDEX_FILE = "index.json"
+OBJECT_DIR = "objects"
+
+
+@dataclass
+class DiskEntry:
+    digest: str  # 内容的 sha256
+    size: int
+    category: str
+    stored: float  # 写入或最近一次重新验证的时间（time.time()）
+    accessed: float  # 最近访问时间，用于 LRU 淘汰
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class DiskCache(WriteBehind):
+    """
+    内容寻址的磁盘缓存
+    - 文件按内容的 sha256 存放在 objects/ 下，相同内容只存一份
+    - index.json 记录 key -> 内容摘要、大小、分类、写入与访问时间
+    - 每个分类有各自的 TTL，总大小超过上限时按最近访问时间淘汰，sweep() 定期清理过期条目
+    - 过期后仍保留 stale 秒，期间可以先返回旧内容再用 ETag / Last-Modified 重新验证
+    - 文件与索引都以 临时文件 + 替换 的方式原子写入
+    - 文件的读写放在线程里；索引只在事件循环中修改，延迟 delay 秒合并写盘
+    - 索引在首次使用时才读取
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        ttls: Optional[Dict[str, int]] = None,
+        stale: int = 0,
+        delay: float = 30.0,
+    ):
+        super().__init__(root / INDEX_FILE, "磁盘缓存索引", delay)
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self.stale = stale
+        self.category_stats: Dict[str, CacheStats] = defaultdict(CacheStats)
+        self._entries: Optional[Dict[str, DiskEntry]] = None
+        self._refs: Dict[str, int] = defaultdict(int)  # digest -> 引用数
+        self._bytes = 0
+
+    # ---------- 索引 ----------
+
+    @property
+    def entries(self) -> Dict[str, DiskEntry]:
+        if self._entries is None:
+            self._load()
+        return self._entries
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / OBJECT_DIR / digest[:2] / digest
+
+    def _load(self) -> None:
+        self._entries = {}
+        index_path = self.root / INDEX_FILE
+        try:
+            raw = json.loads(index_path.read_text("utf-8")) if index_path.exists() else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Steam 磁盘缓存索引损坏，已重建: {e}")
+            raw = {}
+
+        for key, value in raw.items():
+            try:
+                entry = DiskEntry(**value)
+            except TypeError:
+                continue
+            if self._object_path(entry.digest).exists():
+                self._add(key, entry)
+
+        # 清理索引中没有引用的文件（例如写入文件后、保存索引前进程退出）
+        objects = self.root / OBJECT_DIR
+        if objects.exists():
+            for path in objects.glob("*/*"):
+                if path.name not in self._refs:
+                    path.unlink(missing_ok=True)
+        _unlink(self._evict())
+        if self._dirty or len(self._entries) != len(raw):
+            self.save()
+
+    async def load(self) -> None:
+        """在线程中读取索引并清理多余的文件，启动时调用"""
+        if self._entries is None:
+            await asyncio.to_thread(self._load)
+
+    def _serialize(self) -> Dict[str, dict]:
+        if self._entries is None:
+            return {}
+        return {key: asdict(entry) for key, entry in self._entries.items()}
+
+    # ---------- 内部 ----------
+
+    def _add(self, key: str, entry: DiskEntry) -> None:
+        self._entries[key] = entry
+        if self._refs[entry.digest] == 0:
+            self._bytes += entry.size
+        self._refs[entry.digest] += 1
+
+    def _remove(self, key: str) -> List[Path]:
+        """从索引中移除，返回不再被引用、需要删除的文件"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return []
+        self._dirty = True
+        self._refs[entry.digest] -= 1
+        if self._refs[entry.digest] > 0:
+            return []
+        del self._refs[entry.digest]
+        self._bytes -= entry.size
+        return [self._object_path(entry.digest)]
+
+    def _fresh(self, entry: DiskEntry, now: float) -> bool:
+        return now - entry.stored <= self.ttls.get(entry.category, DEFAULT_TTL)
+
+    def _expired(self, entry: DiskEntry, now: float) -> bool:
+        """超过 TTL 与 stale 宽限期，可以删除"""
+        return now - entry.stored > self.ttls.get(entry.category, DEFAULT_TTL) + self.stale
+
+    def _expire(self) -> List[Path]:
+        now = time.time()
+        removed: List[Path] = []
+        for key, entry in list(self.entries.items()):
+            if self._expired(entry, now):
+                removed += self._remove(key)
+                self.category_stats[entry.category].expirations += 1
+        return removed
+
+    def _evict(self) -> List[Path]:
+        if self._bytes <= self.max_bytes:
+            return []
+        # 先清掉过期的，再按最近访问时间从旧到新淘汰
+        removed = self._expire()
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1].accessed):
+            if self._bytes <= self.max_bytes:
+                break
+            removed += self._remove(key)
+            self.category_stats[entry.category].evictions += 1
+        return removed
+
+    async def sweep(self) -> int:
+        """清理超过宽限期的条目，返回删除的文件数"""
+        removed = self._expire()
+        if removed:
+            await asyncio.to_thread(_unlink, removed)
+        if self._dirty:
+            self.save()
+        return len(removed)
+
+    # ---------- 读写 ----------
+
+    async def lookup(self, category: str, key: str) -> Optional[Tuple[bytes, DiskEntry, bool]]:
+        """返回 (内容, 条目, 是否新鲜)，过期但仍在宽限期内的条目也会返回"""
+        stats = self.category_stats[category]
+        entry = self.entries.get(key)
+        if entry is None:
+            stats.misses += 1
+            return None
+
+        if self._expired(entry, time.time()):
+            await asyncio.to_thread(_unlink, self._remove(key))
+            self.save()
+            stats.expirations += 1
+            stats.misses += 1
+            return None
+
+        try:
+            data = await asyncio.to_thread(self._object_path(entry.digest).read_bytes)
+        except OSError:
+            # 读取期间条目可能已被替换，只移除同一个条目
+            if self._entries.get(key) is entry:
+                await asyncio.to_thread(_unlink, self._remove(key))
+                self.save()
+            stats.misses += 1
+            return None
+
+        now = time.time()
+        entry.accessed = now
+        self.save()
+        fresh = self._fresh(entry, now)
+        if fresh:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+        return data, entry, fresh
+
+    def has(self, category: str, key: str) -> bool:
+        """是否有未过期的内容，不读取文件"""
+        entry = self.entries.get(key)
+        return entry is not None and entry.category == category and self._fresh(entry, time.time())
+
+    async def get(self, category: str, key: str) -> Optional[bytes]:
+        """只返回未过期的内容"""
+        found = await self.lookup(category, key)
+        if found is None or not found[2]:
+            return None
+        return found[0]
+
+    async def delete(self, key: str) -> None:
+        """删除条目，例如内容已无法解码"""
+        if key not in self.entries:
+            return
+        await asyncio.to_thread(_unlink, self._remove(key))
+        self.save()
+
+    def touch(self, key: str) -> None:
+        """重新验证成功（304）后刷新写入时间"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.stored = entry.accessed = time.time()
+            self.save()
+
+    async def put(
+        self,
+        category: str,
+        key: str,
+        data: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        entries = self.entries
+        digest = hashlib.sha256(data).hexdigest()
+
+        old = entries.get(key)
+        if old is not None and old.digest == digest:
+            old.stored = old.accessed = time.time()
+            old.etag, old.last_modified = etag, last_modified
+            self.save()
+            return
+
+        try:
+            await asyncio.to_thread(_write_object, self._object_path(digest), data)
+        except OSError as e:
+            logger.error(f"写入 Steam 磁盘缓存失败: {e}")
+            return
+
+        removed = self._remove(key)
+        now = time.time()
+        entry = DiskEntry(digest, len(data), category, now, now, etag, last_modified)
+        self._add(key, entry)
+        # 刚写入的文件又被引用，不能删除
+        removed = [path for path in removed + self._evict() if path.name not in self._refs]
+        if removed:
+            await asyncio.to_thread(_unlink, removed)
+        self.save()
+
+    # ---------- 统计 ----------
+
+    def report(self) -> List[str]:
+        entries = self.entries
+        lines = [
+            f"磁盘缓存: {len(entries)} 条，{self._bytes / 1024 / 1024:.1f}/"
+            f"{self.max_bytes / 1024 / 1024:.0f}MB"
+        ]
+        for category, s in sorted(self.category_stats.items()):
+            lines.append(
+                f"  {category}: 命中率 {s.hit_rate:.0%}（{s.hits}/{s.hits + s.misses}），"
+                f"淘汰 {s.evictions}，过期 {s.expirations}"
+            )
+        return lines
+
+
+def _write_object(path: Path, data: bytes) -> None:
+    if not path.exists():
+        atomic_write(path, data)
+
+
+def _unlink(paths: List[Path]) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+image_cache = DiskCache(
+    store.get_cache_dir("nonebot_plugin_steam_info") / "images",
+    config.steam_disk_cache_size,
+    config.steam_disk_cache_ttl,
+    config.steam_disk_cache_stale,
+    config.steam_disk_cache_flush_delay,
+)
@@ -1,14 +1,23 @@
-import numpy as np
+from __future__ import annotations
+
 from io import BytesIO
 from pathlib import Path
 from typing import List, Dict, Tuple
 from colorsys import rgb_to_hsv, hsv_to_rgb
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 
+from ..madoka_bundle.lazy import lazy_import
 from .utils import hex_to_rgb
 from .models import DrawPlayerStatusData, Achievements
 from .constants import *
 
+# NumPy / Pillow 在首次绘图时才导入
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
+ImageFilter = lazy_import("PIL.ImageFilter")
+ImageEnhance = lazy_import("PIL.ImageEnhance")
+
 WIDTH = 400
 PARENT_AVATAR_SIZE = 72
 MEMBER_AVATAR_SIZE = 50
@@ -560,7 +569,8 @@ def draw_game_info(
     achievement_color: Tuple[int, int, int],
 ) -> Image.Image:
     bg = Image.new("RGBA", (880, 110 + 64 + 10), (0, 0, 0, 110))
-    header = header.resize((229, 86), Image.BICUBIC)
+    if header.size != (229, 86):
+        header = header.resize((229, 86), Image.BICUBIC)
     bg.paste(header, (10, 110 // 2 - header.height // 2))
 
     draw = ImageDraw.Draw(bg)
@@ -628,7 +638,11 @@ def draw_game_info(
     # 画成就图标
     x = 860 - 48 * 6 - 10 * 6
     for achievement in achievements:
-        achievement_image = Image.open(BytesIO(achievement["image"])).resize((48, 48))
+        achievement_image = achievement["image"]
+        if isinstance(achievement_image, bytes):
+            achievement_image = Image.open(BytesIO(achievement_image))
+        if achievement_image.size != (48, 48):
+            achievement_image = achievement_image.resize((48, 48))
         achievement_bg.paste(achievement_image, (x, 8))
         x += 48 + 10
 
@@ -747,7 +761,10 @@ def draw_player_status(
     )
     game_images: List[Image.Image] = []
     for idx, game in enumerate(player_games):
-        game_image = Image.open(BytesIO(game["game_header"]))
+        # 游戏头图通常已由 AppAssetStore 解码并缩放好
+        game_image = game["game_header"]
+        if isinstance(game_image, bytes):
+            game_image = Image.open(BytesIO(game_image))
         game_info = draw_game_info(
             game_image,
             game["game_name"],
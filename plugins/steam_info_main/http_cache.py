@@ -0,0 +1,160 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from nonebot.log import logger
+
+from .client import http_clients
+from .disk_cache import DiskCache, DiskEntry, image_cache
+from .resilience import CircuitOpenError, guarded_get
+from .singleflight import get_flight
+
+
+@dataclass
+class RevalidateStats:
+    requests: int = 0  # 完整下载
+    revalidations: int = 0  # 带验证器的条件请求
+    not_modified: int = 0  # 304
+    stale_served: int = 0  # 先返回旧内容、后台重新验证
+    errors: int = 0
+    bytes_saved: int = 0  # 因 304 少下载的字节数
+
+    def summary(self) -> str:
+        return (
+            f"下载 {self.requests}，条件请求 {self.revalidations}（304×{self.not_modified}，"
+            f"节省 {self.bytes_saved / 1024:.0f}KB），过期先用 {self.stale_served}，失败 {self.errors}"
+        )
+
+
+class ConditionalFetcher:
+    """
+    带 HTTP 缓存验证的下载
+    - 新鲜的缓存直接返回
+    - 过期但在宽限期内的缓存先返回，同时在后台用 If-None-Match / If-Modified-Since 重新验证；
+      fetch_fresh() 则等待重新验证的结果，并告知调用方拿到的是否为最新内容
+    - 304 视为缓存仍然有效，只刷新写入时间
+    - 请求失败时若有旧内容则继续使用旧内容
+    """
+
+    def __init__(self, disk: DiskCache):
+        self.disk = disk
+        self.stats = RevalidateStats()
+        self._flight = get_flight("缓存验证")
+        self._background: Set[asyncio.Task] = set()
+
+    async def fetch(
+        self,
+        url: str,
+        category: str,
+        proxy: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+    ) -> Optional[bytes]:
+        found = await self.disk.lookup(category, url)
+        if found is not None:
+            data, entry, fresh = found
+            if fresh:
+                return data
+            self.stats.stale_served += 1
+            task = asyncio.create_task(
+                self._revalidate(url, category, proxy, headers, cookies, data, entry)
+            )
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return data
+        data, _ = await self._revalidate(url, category, proxy, headers, cookies)
+        return data
+
+    async def fetch_fresh(
+        self,
+        url: str,
+        category: str,
+        proxy: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+    ) -> Tuple[Optional[bytes], bool]:
+        """
+        返回 (内容, 是否为最新)；过期的缓存先重新验证，不直接返回
+        请求失败时仍返回旧内容，但标记为非最新，调用方不应把它当作新数据缓存
+        调用方自己有缓存、需要拿到最新内容时使用
+        """
+        found = await self.disk.lookup(category, url)
+        if found is None:
+            return await self._revalidate(url, category, proxy, headers, cookies)
+        data, entry, fresh = found
+        if fresh:
+            return data, True
+        return await self._revalidate(url, category, proxy, headers, cookies, data, entry)
+
+    async def _revalidate(
+        self,
+        url: str,
+        category: str,
+        proxy: Optional[str],
+        headers: Optional[Dict[str, str]],
+        cookies: Optional[Dict[str, str]],
+        data: Optional[bytes] = None,
+        entry: Optional[DiskEntry] = None,
+    ) -> Tuple[Optional[bytes], bool]:
+        return await self._flight.do(
+            (url, proxy),
+            lambda: self._request(url, category, proxy, headers, cookies, data, entry),
+        )
+
+    async def _request(
+        self,
+        url: str,
+        category: str,
+        proxy: Optional[str],
+        headers: Optional[Dict[str, str]],
+        cookies: Optional[Dict[str, str]],
+        data: Optional[bytes],
+        entry: Optional[DiskEntry],
+    ) -> Tuple[Optional[bytes], bool]:
+        """返回 (内容, 是否为最新)，请求失败时退回旧内容"""
+        request_headers = dict(headers or {})
+        if entry is not None and (entry.etag or entry.last_modified):
+            if entry.etag:
+                request_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request_headers["If-Modified-Since"] = entry.last_modified
+            self.stats.revalidations += 1
+        else:
+            self.stats.requests += 1
+
+        try:
+            client = http_clients.get(proxy)
+            response = await guarded_get(client, url, headers=request_headers, cookies=cookies)
+        except CircuitOpenError as e:
+            self.stats.errors += 1
+            logger.debug(f"跳过请求: {url}, {e}")
+            return data, False
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"请求失败: {url}, 错误: {e}")
+            return data, False
+
+        if response.status_code == 304 and data is not None:
+            self.stats.not_modified += 1
+            self.stats.bytes_saved += len(data)
+            self.disk.touch(url)
+            return data, True
+        if response.status_code == 200:
+            await self.disk.put(
+                category,
+                url,
+                response.content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            return response.content, True
+
+        self.stats.errors += 1
+        logger.warning(f"请求失败: {url}, 状态码: {response.status_code}")
+        return data, False
+
+    def report(self) -> List[str]:
+        return [f"缓存验证: {self.stats.summary()}"]
+
+
+asset_fetcher = ConditionalFetcher(image_cache)
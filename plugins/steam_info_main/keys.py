@@ -0,0 +1,143 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import count
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def mask_key(key: str) -> str:
+    return f"{key[:4]}…{key[-4:]}" if len(key) > 8 else "****"
+
+
+@dataclass
+class KeyUsage:
+    """单个 API Key 的用量"""
+    key: str
+    day: str
+    calls: int = 0  # 当日调用次数
+    total_calls: int = 0
+    throttled: int = 0  # 429 次数
+    forbidden: int = 0  # 403 次数
+    strikes: int = 0  # 连续被限流次数，决定隔离时长
+    quarantined_until: float = 0.0
+
+    def rollover(self) -> None:
+        today = _today()
+        if self.day != today:
+            self.day = today
+            self.calls = 0
+
+    @property
+    def quarantined(self) -> bool:
+        return time.monotonic() < self.quarantined_until
+
+
+class SteamKeyPool:
+    """
+    Steam API Key 池
+    - round_robin: 依次轮换；least_used: 选当日调用最少的 Key
+    - 记录每个 Key 的当日调用数以及 429/403 次数
+    - 被限流的 Key 暂时隔离，连续被限流时隔离时间翻倍
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[str],
+        strategy: str = "round_robin",
+        daily_limit: int = 100000,
+        quarantine: float = 300.0,
+    ):
+        self.strategy = strategy
+        self.daily_limit = daily_limit
+        self.quarantine = quarantine
+        today = _today()
+        self._usage: Dict[str, KeyUsage] = {
+            key: KeyUsage(key=key, day=today) for key in dict.fromkeys(keys) if key
+        }
+        self._order: List[str] = list(self._usage)
+        self._counter = count()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _available(self, usage: KeyUsage) -> bool:
+        usage.rollover()
+        return not usage.quarantined and usage.calls < self.daily_limit
+
+    def acquire(self) -> Optional[str]:
+        """取一个可用的 Key 并计数，全部不可用时返回 None"""
+        if not self._order:
+            return None
+        if self.strategy == "least_used":
+            candidates = [u for u in self._usage.values() if self._available(u)]
+            if not candidates:
+                return None
+            usage = min(candidates, key=lambda u: u.calls)
+        else:
+            usage = None
+            for _ in range(len(self._order)):
+                candidate = self._usage[self._order[next(self._counter) % len(self._order)]]
+                if self._available(candidate):
+                    usage = candidate
+                    break
+            if usage is None:
+                return None
+        usage.calls += 1
+        usage.total_calls += 1
+        return usage.key
+
+    def report_success(self, key: str) -> None:
+        if usage := self._usage.get(key):
+            usage.strikes = 0
+
+    def report_status(self, key: str, status_code: int) -> None:
+        """记录失败响应，429/403 时隔离该 Key"""
+        usage = self._usage.get(key)
+        if usage is None:
+            return
+        if status_code == 429:
+            usage.throttled += 1
+        elif status_code == 403:
+            usage.forbidden += 1
+        else:
+            return
+        usage.strikes += 1
+        seconds = self.quarantine * 2 ** min(usage.strikes - 1, 6)
+        usage.quarantined_until = time.monotonic() + seconds
+
+    def report(self) -> List[str]:
+        lines = []
+        now = time.monotonic()
+        for i, usage in enumerate(self._usage.values(), start=1):
+            usage.rollover()
+            state = (
+                f"隔离中 {usage.quarantined_until - now:.0f}s"
+                if usage.quarantined
+                else "可用"
+            )
+            lines.append(
+                f"#{i} {mask_key(usage.key)}: 今日 {usage.calls}/{self.daily_limit}，累计 {usage.total_calls}，"
+                f"429×{usage.throttled} 403×{usage.forbidden}，{state}"
+            )
+        return lines
+
+
+_pools: Dict[Tuple[str, ...], SteamKeyPool] = {}
+
+
+def get_key_pool(
+    api_key,
+    strategy: str = "round_robin",
+    daily_limit: int = 100000,
+    quarantine: float = 300.0,
+) -> SteamKeyPool:
+    """按 Key 列表复用 Key 池，api_key 可以是单个字符串或列表"""
+    keys = (api_key,) if isinstance(api_key, str) else tuple(api_key or ())
+    pool = _pools.get(keys)
+    if pool is None:
+        pool = _pools[keys] = SteamKeyPool(keys, strategy, daily_limit, quarantine)
+    return pool
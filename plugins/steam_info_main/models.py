@@ -1,4 +1,7 @@
-from typing import TypedDict, List
+from typing import TYPE_CHECKING, TypedDict, List, Union
+
+if TYPE_CHECKING:
+    from PIL.Image import Image
 
 
 class Player(TypedDict):
@@ -39,14 +42,14 @@ class PlayerSummariesProcessedResponse(TypedDict):
 
 class Achievements(TypedDict):
     name: str
-    image: bytes
+    image: Union[bytes, "Image"]  # 48x48
 
 
 class GameData(TypedDict):
     game_name: str
     play_time: str  # e.g. 10.2
     last_played: str  # e.g. 10 月 2 日
-    game_image: bytes
+    game_image: Union[bytes, "Image"]  # 229x86
     achievements: List[Achievements]
     completed_achievement_number: int
     total_achievement_number: int
@@ -66,7 +69,7 @@ class DrawPlayerStatusData(TypedDict):
     game_name: str
     game_time: str  # e.g. 10.2 小时（过去 2 周）
     last_play_time: str  # e.g. 10 月 2 日
-    game_header: bytes
+    game_header: Union[bytes, "Image"]
     achievements: List[Achievements]
     completed_achievement_number: int
     total_achievement_number: int
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional, Protocol
+
+from nonebot.log import logger
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """先写临时文件再替换，进程中途退出也不会留下半个文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+@dataclass
+class FlushStats:
+    requested: int = 0  # save() 调用次数
+    flushes: int = 0  # 实际写盘次数
+    failures: int = 0
+    bytes: int = 0  # 最近一次写入的大小
+    last: float = 0.0  # 最近一次写盘耗时（秒）
+    slowest: float = 0.0
+    total: float = 0.0
+
+    def summary(self) -> str:
+        average = self.total / self.flushes if self.flushes else 0.0
+        return (
+            f"保存 {self.requested} 次 -> 写盘 {self.flushes} 次，失败 {self.failures}，"
+            f"大小 {self.bytes / 1024:.1f}KB，耗时 平均 {average * 1000:.1f}ms / "
+            f"最慢 {self.slowest * 1000:.1f}ms"
+        )
+
+
+class Flushable(Protocol):
+    name: str
+    stats: FlushStats
+
+    async def flush(self) -> None: ...
+
+
+_stores: List[Flushable] = []
+
+
+def register(store: Flushable) -> None:
+    _stores.append(store)
+
+
+async def flush_all() -> None:
+    """关闭时调用，把所有尚未写盘的修改写入文件"""
+    results = await asyncio.gather(
+        *(store.flush() for store in _stores), return_exceptions=True
+    )
+    for store, result in zip(_stores, results):
+        if isinstance(result, BaseException):
+            logger.error(f"保存 {store.name} 失败: {result}")
+
+
+def report() -> List[str]:
+    return [f"{store.name}: {store.stats.summary()}" for store in _stores]
+
+
+class WriteBehind(ABC):
+    """
+    延迟合并写盘的 JSON 文件
+    save() 只标记为已修改，延迟 delay 秒后合并为一次写盘：
+    - 序列化在事件循环中完成（保证拿到一致的快照），写文件放到线程里
+    - 先写临时文件再替换，紧凑格式
+    - 写入失败时重新排一次；关闭时由 flush_all() 写入剩余的修改
+    """
+
+    def __init__(self, save_path: Path, name: str, delay: float) -> None:
+        self._save_path = save_path
+        self.name = name
+        self.delay = delay
+        self.stats = FlushStats()
+        self._dirty = False
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        register(self)
+
+    @abstractmethod
+    def _serialize(self) -> Any:
+        """写入文件的数据"""
+
+    def save(self) -> None:
+        self.stats.requested += 1
+        self._dirty = True
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环（例如启动前）时直接写入
+            self._write(self._dump())
+            return
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.delay)
+        # 写盘期间再次 save() 时需要重新排一次
+        self._timer = None
+        await self.flush()
+
+    def _dump(self) -> bytes:
+        self._dirty = False
+        data = self._serialize()
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def _write(self, data: bytes) -> None:
+        start = time.perf_counter()
+        try:
+            atomic_write(self._save_path, data)
+        except OSError as e:
+            self._dirty = True
+            self.stats.failures += 1
+            logger.error(f"写入 {self._save_path} 失败: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        self.stats.flushes += 1
+        self.stats.bytes = len(data)
+        self.stats.last = elapsed
+        self.stats.slowest = max(self.stats.slowest, elapsed)
+        self.stats.total += elapsed
+
+    async def flush(self) -> None:
+        """立即写入尚未写盘的修改；同一文件的写入按顺序进行"""
+        async with self._lock:
+            if not self._dirty:
+                return
+            await asyncio.to_thread(self._write, self._dump())
+            if self._dirty:
+                # 写入失败（或写盘期间又有修改）时重新排一次，不等下一次 save()
+                self._schedule()
@@ -0,0 +1,154 @@
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from .models import Player
+
+POLL_TICK = 10  # 调度检查间隔（秒）
+BATCH_SIZE = 100  # 单次 GetPlayerSummaries 请求的 ID 上限
+
+# 活跃度分级，对应的轮询间隔为 base * 倍数
+TIER_FACTORS = {
+    "游戏中": 1,
+    "在线": 1,
+    "刚离线": 4,  # 离线不到 1 小时
+    "离线": 10,  # 离线不到 1 天
+    "长期离线": math.inf,  # 取最大间隔
+}
+
+
+class RequestBudget:
+    """
+    Steam Web API 的每分钟请求预算
+    每次实际发出请求时扣除（包括重试与命令触发的请求），轮询按剩余预算决定本次取多少玩家
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self._allowance = per_minute * POLL_TICK / 60
+        self._last_refill = time.monotonic()
+        self.charged = 0  # 累计请求数
+
+    def _refill(self) -> None:
+        # 最多攒一分钟的预算，避免长时间空闲后一次性爆发
+        now = time.monotonic()
+        self._allowance = min(
+            self.per_minute,
+            self._allowance + (now - self._last_refill) * self.per_minute / 60,
+        )
+        self._last_refill = now
+
+    def available(self) -> float:
+        self._refill()
+        return self._allowance
+
+    def charge(self, requests: int = 1) -> None:
+        self._refill()
+        self._allowance -= requests
+        self.charged += requests
+
+
+@dataclass
+class PollState:
+    steamid: str
+    next_due: float  # time.monotonic()
+    interval: float
+    tier: str = "刚离线"
+    last_active: Optional[float] = None  # 最近一次在线的时间（time.time()）
+
+
+class AdaptivePoller:
+    """
+    按玩家活跃度调整轮询间隔
+    - 游戏中 / 在线的玩家按基础间隔轮询，离线越久间隔越长，直到最大间隔
+    - 新加入的玩家在一个基础间隔内随机错开，避免所有请求挤在同一时刻
+    - 每次调度按全局请求预算的剩余量发放名额，预算不足时优先轮询最早到期的玩家；
+      预算在请求实际发出时扣除，缓存命中的玩家不占预算
+    """
+
+    def __init__(self, base_interval: float, max_interval: float, budget: RequestBudget):
+        self.base_interval = base_interval
+        self.max_interval = max(base_interval, max_interval)
+        self.budget = budget
+        self._states: Dict[str, PollState] = {}
+        self.polled = 0  # 累计轮询的玩家次数
+        self.deferred = 0  # 因预算不足推迟的玩家次数
+
+    # ---------- 调度 ----------
+
+    def sync(self, steam_ids: Iterable[str]) -> None:
+        """与当前绑定的 steamid 同步：新增的随机错开，解绑的移除"""
+        now = time.monotonic()
+        wanted = set(steam_ids)
+        for steamid in list(self._states):
+            if steamid not in wanted:
+                del self._states[steamid]
+        for steamid in wanted - self._states.keys():
+            self._states[steamid] = PollState(
+                steamid=steamid,
+                next_due=now + random.uniform(0, self.base_interval),
+                interval=self.base_interval,
+            )
+
+    def due(self) -> List[str]:
+        """取出本次应轮询的 steamid，受预算限制"""
+        now = time.monotonic()
+        due = sorted(
+            (state for state in self._states.values() if state.next_due <= now),
+            key=lambda state: state.next_due,
+        )
+        if not due:
+            return []
+        capacity = max(int(self.budget.available()), 0) * BATCH_SIZE
+        selected, deferred = due[:capacity], due[capacity:]
+        self.deferred += len(deferred)
+        self.polled += len(selected)
+        for state in selected:
+            # 先按当前间隔排下一次，拿到结果后再根据状态调整
+            state.next_due = now + state.interval
+        return [state.steamid for state in selected]
+
+    # ---------- 活跃度 ----------
+
+    def _tier(self, player: Player, state: PollState, now: float) -> str:
+        if player.get("gameextrainfo"):
+            return "游戏中"
+        if player.get("personastate"):
+            return "在线"
+        last_active = state.last_active or player.get("lastlogoff")
+        if not last_active:
+            return "长期离线"
+        offline = now - last_active
+        if offline < 3600:
+            return "刚离线"
+        if offline < 86400:
+            return "离线"
+        return "长期离线"
+
+    def observe(self, players: Iterable[Player]) -> None:
+        """根据刚轮询到的状态决定每个玩家的下一次轮询时间"""
+        now_wall = time.time()
+        now = time.monotonic()
+        for player in players:
+            state = self._states.get(player.get("steamid"))
+            if state is None:
+                continue
+            if player.get("personastate") or player.get("gameextrainfo"):
+                state.last_active = now_wall
+            state.tier = self._tier(player, state, now_wall)
+            state.interval = min(self.max_interval, self.base_interval * TIER_FACTORS[state.tier])
+            state.next_due = now + state.interval
+
+    def report(self) -> List[str]:
+        tiers = Counter(state.tier for state in self._states.values())
+        per_minute = sum(60 / state.interval for state in self._states.values())
+        return [
+            f"轮询: 跟踪 {len(self._states)} 个玩家，每分钟约 {per_minute:.0f} 人次"
+            f"（预算 {self.budget.per_minute:g} 次请求/分钟，每次最多 {BATCH_SIZE} 人）",
+            "  " + "，".join(f"{tier} {tiers[tier]}" for tier in TIER_FACTORS if tiers[tier]),
+            f"  累计轮询 {self.polled} 人次，API 共请求 {self.budget.charged} 次，"
+            f"因预算推迟 {self.deferred} 人次",
+        ]
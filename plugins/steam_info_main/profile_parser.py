@@ -0,0 +1,195 @@
+"""
+Steam 个人主页解析
+只依赖标准库，可以脱离插件单独导入（tools/bench_profile_parser.py 会直接加载本文件）
+"""
+
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple, Union
+
+CHUNK_SIZE = 16 * 1024
+
+TITLE_PREFIX = "Steam 社区 :: "
+BACKGROUND_URL_PATTERN = re.compile(r"url\(\s*['\"]?([^'\")]+?)['\"]?\s*\)")
+HOURS_PATTERN = re.compile(r"([\d,.]+)\s*小时")
+LAST_PLAYED_PATTERN = re.compile(r"最后运行日期[：:]\s*(.+)")
+ACHIEVEMENT_PATTERN = re.compile(r"(\d+)\s*/\s*(\d+)")
+EMOTICON_PATTERN = re.compile(r"ː.*?ː")
+APP_ID_PATTERN = re.compile(r"/app/(\d+)")
+
+# 需要收集文本的 div，按 class 匹配
+TEXT_ROLES = {
+    "profile_summary": "summary",
+    "recentgame_recentplaytime": "playtime",
+    "game_info_details": "details",
+    "game_name": "name",
+    "game_info_achievement_summary": "achievements",
+}
+
+
+@dataclass
+class RecentGame:
+    name: str = ""
+    app_id: Optional[str] = None
+    image_url: Optional[str] = None
+    play_time: Optional[str] = None  # e.g. 10.2
+    last_played: Optional[str] = None  # e.g. 10 月 2 日
+    completed_achievements: int = 0
+    total_achievements: int = 0
+
+
+@dataclass
+class ProfilePage:
+    player_name: Optional[str] = None
+    description: Optional[str] = None
+    avatar_url: Optional[str] = None
+    background_url: Optional[str] = None
+    recent_playtime: Optional[str] = None  # e.g. 10.2 小时（过去 2 周）
+    games: List[RecentGame] = field(default_factory=list)
+
+
+class ProfileParser(HTMLParser):
+    """
+    单次遍历的主页解析器
+    - 只跟踪 div 的嵌套关系，只在需要的区块里收集文本
+    - 最近游戏区块结束后即视为完成，调用方可以停止继续喂数据
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.page = ProfilePage()
+        self.done = False
+        self._divs: List[Tuple[Optional[str], Optional[str]]] = []  # (文本角色, 区块)
+        self._text: List[str] = []
+        self._in_title = False
+        self._title: List[str] = []
+        self._in_recent = False
+        self._in_avatar = False
+        self._game: Optional[RecentGame] = None
+
+    # ---------- 工具 ----------
+
+    @property
+    def _role(self) -> Optional[str]:
+        for role, _ in reversed(self._divs):
+            if role is not None:
+                return role
+        return None
+
+    def _flush_text(self, role: str) -> None:
+        text = "".join(self._text)
+        self._text = []
+        page, game = self.page, self._game
+        if role == "summary":
+            text = EMOTICON_PATTERN.sub("", text.replace("\t", ""))
+            page.description = text.strip()
+        elif role == "playtime":
+            page.recent_playtime = " ".join(text.split())
+        elif game is None:
+            return
+        elif role == "name":
+            game.name = text.strip()
+        elif role == "details":
+            if match := HOURS_PATTERN.search(text):
+                game.play_time = match.group(1).replace(",", "")
+            lines = [line.strip() for line in text.splitlines() if line.strip()]
+            if match := LAST_PLAYED_PATTERN.search(text):
+                game.last_played = match.group(1).strip()
+            elif len(lines) > 1:
+                game.last_played = lines[-1]  # 例如 “当前正在游戏”
+        elif role == "achievements":
+            if match := ACHIEVEMENT_PATTERN.search(text):
+                game.completed_achievements = int(match.group(1))
+                game.total_achievements = int(match.group(2))
+
+    # ---------- HTMLParser ----------
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "title":
+            self._in_title = True
+        elif tag == "br":
+            if self._role is not None:
+                self._text.append("\n")
+        elif tag == "div":
+            attributes = dict(attrs)
+            classes = (attributes.get("class") or "").split()
+            role = next((TEXT_ROLES[c] for c in classes if c in TEXT_ROLES), None)
+            block = None
+            if "recent_games" in classes:
+                block = "recent_games"
+                self._in_recent = True
+            elif "recent_game" in classes and self._in_recent:
+                block = "recent_game"
+                self._game = RecentGame()
+            elif "playerAvatarAutoSizeInner" in classes:
+                block = "avatar"
+                self._in_avatar = True
+            elif "profile_avatar_frame" in classes:
+                block = "avatar_frame"
+            elif "profile_page" in classes and self.page.background_url is None:
+                style = attributes.get("style") or ""
+                if match := BACKGROUND_URL_PATTERN.search(style):
+                    self.page.background_url = match.group(1).strip()
+            if role is not None:
+                self._text = []
+            self._divs.append((role, block))
+        elif tag == "img":
+            attributes = dict(attrs)
+            src = attributes.get("src")
+            in_frame = any(block == "avatar_frame" for _, block in self._divs)
+            if self._in_avatar and not in_frame and src and self.page.avatar_url is None:
+                self.page.avatar_url = src
+            elif self._game is not None and "game_capsule" in (attributes.get("class") or ""):
+                self._game.image_url = src
+        elif tag == "a" and self._game is not None and self._game.app_id is None:
+            if match := APP_ID_PATTERN.search(dict(attrs).get("href") or ""):
+                self._game.app_id = match.group(1)
+        elif tag == "video" and self.page.background_url is None:
+            # 动态背景取视频封面
+            poster = dict(attrs).get("poster")
+            if poster:
+                self.page.background_url = poster
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag == "title":
+            self._in_title = False
+            title = "".join(self._title).strip()
+            if title.startswith(TITLE_PREFIX):
+                self.page.player_name = title[len(TITLE_PREFIX):]
+        elif tag == "div" and self._divs:
+            role, block = self._divs.pop()
+            if role is not None:
+                self._flush_text(role)
+            if block == "recent_game" and self._game is not None:
+                self.page.games.append(self._game)
+                self._game = None
+            elif block == "avatar":
+                self._in_avatar = False
+            elif block == "recent_games":
+                self._in_recent = False
+                self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title.append(data)
+        elif self._role is not None:
+            self._text.append(data)
+
+
+def parse_profile(html: Union[str, bytes], chunk_size: int = CHUNK_SIZE) -> ProfilePage:
+    """分块喂给解析器，拿到最近游戏后就不再解析页面剩余部分"""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    parser = ProfileParser()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        if parser.done:
+            break
+    else:
+        parser.close()
+    return parser.page
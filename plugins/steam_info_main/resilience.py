@@ -0,0 +1,151 @@
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .config import config
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_NAMES = {CLOSED: "正常", OPEN: "熔断", HALF_OPEN: "试探"}
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时直接失败，不发出请求"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"{host} 已熔断，{retry_after:.0f}s 后重试")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = config.steam_retry_backoff_base,
+    cap: float = config.steam_retry_backoff_max,
+) -> float:
+    """指数退避 + 全抖动：在 [0, min(cap, base * 2^attempt)] 中随机取值"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+@dataclass
+class BreakerStats:
+    successes: int = 0
+    failures: int = 0
+    rejected: int = 0  # 熔断期间被拒绝的请求
+    opened: int = 0  # 打开次数
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器
+    - closed: 正常放行，连续失败达到阈值后打开
+    - open: 直接拒绝，经过 reset_timeout 后进入 half_open
+    - half_open: 只放行一个试探请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, host: str, threshold: int, reset_timeout: float):
+        self.host = host
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.stats = BreakerStats()
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.stats.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.stats.rejected += 1
+                return False
+            self._probing = True
+        return True
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(self.host, self.retry_after())
+
+    def release(self) -> None:
+        """请求既没有成功也没有失败（例如被取消）时释放试探名额"""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.stats.successes += 1
+        self._consecutive = 0
+        self._probing = False
+        self.state = CLOSED
+
+    def record_failure(self) -> None:
+        self.stats.failures += 1
+        self._consecutive += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self._consecutive >= self.threshold:
+            if self.state != OPEN:
+                self.stats.opened += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def summary(self) -> str:
+        state = STATE_NAMES[self.state]
+        if self.state == OPEN:
+            state += f"（{self.retry_after():.0f}s 后试探）"
+        s = self.stats
+        return (
+            f"{self.host}: {state}，成功 {s.successes}，失败 {s.failures}，"
+            f"拒绝 {s.rejected}，熔断 {s.opened} 次"
+        )
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    host = urlsplit(url).netloc or url
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(
+            host, config.steam_breaker_threshold, config.steam_breaker_reset
+        )
+    return breaker
+
+
+async def guarded_get(
+    client: httpx.AsyncClient, url: str, breaker: Optional[CircuitBreaker] = None, **kwargs
+) -> httpx.Response:
+    """
+    经过熔断器的 GET 请求
+    熔断时抛出 CircuitOpenError；网络异常与 5xx 记为失败，其余响应记为成功
+    """
+    breaker = breaker or get_breaker(url)
+    breaker.check()
+    try:
+        response = await client.get(url, **kwargs)
+    except httpx.TransportError:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def report() -> List[str]:
+    return [breaker.summary() for breaker in _breakers.values()]
@@ -0,0 +1,58 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, List, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    calls: int = 0
+    executed: int = 0  # 实际发出的请求
+    coalesced: int = 0  # 合并到已有请求上的调用
+
+    def summary(self) -> str:
+        return f"调用 {self.calls}，实际请求 {self.executed}，合并 {self.coalesced}"
+
+
+class SingleFlight:
+    """
+    合并相同 key 的并发请求
+    - 同一 key 同时只执行一次，其余调用方等待同一个任务的结果
+    - 任务独立于调用方运行，某个调用方被取消不会影响其他调用方
+    - 任务结束后立即移除，不缓存结果
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = FlightStats()
+        self._inflight: Dict[Hashable, "asyncio.Task"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.stats.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats.coalesced += 1
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_flight(name: str) -> SingleFlight:
+    flight = _groups.get(name)
+    if flight is None:
+        flight = _groups[name] = SingleFlight(name)
+    return flight
+
+
+def report() -> List[str]:
+    return [f"{name}: {flight.stats.summary()}" for name, flight in _groups.items()]
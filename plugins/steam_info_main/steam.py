@@ -1,96 +1,84 @@
-import re
 import httpx
-from pathlib import Path
-from bs4 import BeautifulSoup
 from nonebot.log import logger
-from typing import List, Optional, Dict, Tuple, Any
+from typing import List, Optional, Dict, Tuple, Any, Union
 from datetime import datetime, timezone
 import time
-import threading
 import asyncio
-
-from .models import PlayerSummaries, PlayerData
+from dataclasses import dataclass
+
+from ..madoka_bundle.cache import TTLCache
+from .app_assets import app_asset_store
+from .client import http_clients
+from .config import config
+from .http_cache import asset_fetcher
+from .keys import SteamKeyPool
+from .singleflight import get_flight
+from .profile_parser import ProfilePage, parse_profile
+from .webapi import FetchStats, RecentGameStats, api_get, get_recent_game_stats, steam_key_pool
+from .models import GameData, PlayerSummaries, PlayerData
 from .constants import *
 
 
+
 STEAM_ID_OFFSET = 76561197960265728
 
 # ----------------------------
-# HTTP CLIENT（修复并发关闭）
+# HTTP CLIENT（按代理复用）
 # ----------------------------
-_http_client: Optional[httpx.AsyncClient] = None
-_http_client_lock = asyncio.Lock()
-
 async def get_http_client(proxy: Optional[str]) -> httpx.AsyncClient:
-    global _http_client
-    async with _http_client_lock:
-        if _http_client is None or _http_client.is_closed:
-            _http_client = httpx.AsyncClient(
-                proxy=proxy,
-                timeout=httpx.Timeout(connect=10.0, read=15.0, write=10.0, pool=5.0),
-                headers={"User-Agent": "MadokaBot/SteamInfo"},
-                follow_redirects=True,
-                limits=httpx.Limits(
-                    max_connections=10,
-                    keepalive_expiry=30.0
-                )
-            )
-            logger.debug(f"Steam HTTP client initialized (proxy={proxy})")
-        return _http_client
+    return http_clients.get(proxy)
 
 
 # ----------------------------
-# CACHE（修复线程不安全）
+# CACHE（按 steamid 缓存玩家摘要）
 # ----------------------------
-STEAM_USER_CACHE_TTL = 30
+STEAM_USER_CACHE_TTL = config.steam_player_cache_ttl
 STEAM_USER_CACHE_MAXSIZE = 5000
 
-_steam_user_cache: Dict[str, Tuple[float, dict]] = {}
-STEAM_USER_CACHE_LOCK = threading.Lock()
-
-
-def _cache_get(key: str, ttl: int) -> Optional[dict]:
-    with STEAM_USER_CACHE_LOCK:
-        value = _steam_user_cache.get(key)
-        if not value:
-            return None
-        ts, data = value
-        if time.time() - ts > ttl:
-            _steam_user_cache.pop(key, None)
-            return None
-        return data
-
-
-def _cache_set(key: str, data: dict):
-    with STEAM_USER_CACHE_LOCK:
-        if len(_steam_user_cache) >= STEAM_USER_CACHE_MAXSIZE:
-            # 简单淘汰最早的一条（不改结构）
-            oldest_key = min(_steam_user_cache.items(), key=lambda x: x[1][0])[0]
-            _steam_user_cache.pop(oldest_key, None)
-        _steam_user_cache[key] = (time.time(), data)
+steam_user_cache: TTLCache[str, dict] = TTLCache(
+    maxsize=STEAM_USER_CACHE_MAXSIZE,
+    ttl=STEAM_USER_CACHE_TTL,
+    name="玩家摘要缓存",
+)
 
 
 async def get_steam_users_info_cached(
     steam_ids: List[str],
-    api_key: str,
+    api_key: Union[str, List[str]],
     proxy: Optional[str],
-    ttl: int,
+    ttl: int = STEAM_USER_CACHE_TTL,
+    stats: Optional[FetchStats] = None,
 ) -> dict:
-    steam_ids_sorted = sorted(steam_ids)
-    cache_key = f"{api_key}:{','.join(steam_ids_sorted)}"
-
-    cached = _cache_get(cache_key, ttl)
-    if cached is not None:
-        return cached
-
-    data = await get_steam_users_info(
-        steam_ids=steam_ids_sorted,
-        api_key=api_key,
-        proxy=proxy,
-    )
+    """
+    带缓存的玩家摘要
+    每个 steamid 单独缓存，命中的直接返回，未命中的合并为一次批量请求
+    返回的玩家字典均为副本，调用方可以随意修改
+    传入 stats 时记录本次请求的统计（轮询用）
+    """
+    players: List[dict] = []
+    missing: List[str] = []
+
+    for steam_id in dict.fromkeys(steam_ids):
+        cached = steam_user_cache.get(steam_id)
+        if cached is not None:
+            players.append(dict(cached))
+        else:
+            missing.append(steam_id)
+    if stats is not None:
+        stats.cached = len(players)
+
+    if missing:
+        data = await get_steam_users_info(
+            steam_ids=missing,
+            api_key=api_key,
+            proxy=proxy,
+            stats=stats,
+        )
+        for player in data["response"]["players"]:
+            steam_user_cache.set(player["steamid"], dict(player), ttl)
+            players.append(player)
 
-    _cache_set(cache_key, data)
-    return data
+    return {"response": {"players": players}}
 
 
 # ----------------------------
@@ -111,118 +99,240 @@ def get_steam_id(steam_id_or_steam_friends_code: str) -> Optional[str]:
 # ----------------------------
 # Steam API
 # ----------------------------
-STEAM_BATCH_SIZE = 25
+STEAM_BATCH_SIZE = 100  # GetPlayerSummaries 单次最多 100 个 ID
+COMMUNITY_BASE_URL = config.steam_community_base_url.rstrip("/")
+PLAYER_SUMMARIES_PATH = "ISteamUser/GetPlayerSummaries/v2/"
+
+def _simplize_player(p: dict) -> dict:
+    return {
+        "steamid": p.get("steamid"),
+        "personaname": p.get("personaname"),
+        "personastate": p.get("personastate"),
+        "gameextrainfo": p.get("gameextrainfo"),
+        "avatar": p.get("avatar"),
+        "avatarfull": p.get("avatarfull"),
+        "avatarhash": p.get("avatarhash"),
+        "lastlogoff": p.get("lastlogoff"),
+        "gameid": p.get("gameid"),
+        "communityvisibilitystate": p.get("communityvisibilitystate"),
+    }
+
+
+async def _fetch_players_batch(
+    batch: List[str],
+    pool: SteamKeyPool,
+    proxy: Optional[str],
+    stats: FetchStats,
+) -> List[dict]:
+    start = time.perf_counter()
+    data = await api_get(
+        PLAYER_SUMMARIES_PATH, {"steamids": ",".join(batch)}, proxy, pool=pool, stats=stats
+    )
+    stats.batch_times.append(time.perf_counter() - start)
+    if data is None:
+        stats.failures += 1
+        return []
+    players = data.get("response", {}).get("players", [])
+    return [_simplize_player(p) for p in players]
+
 
 async def get_steam_users_info(
     steam_ids: List[str],
-    api_key: str,
+    api_key: Union[str, List[str]],
     proxy: Optional[str] = None,
+    stats: Optional[FetchStats] = None,
 ) -> dict:
+    """
+    批量获取玩家摘要
+    每批最多 100 个 ID，各批并发请求，受令牌桶与并发上限约束，单批失败独立重试
+    api_key 可以是多个 Key，按 Key 池策略轮换
+    统计写入传入的 stats，不传则只输出到日志
+    """
     if not steam_ids:
         return {"response": {"players": []}}
 
-    all_players: List[dict] = []
-
-    for i in range(0, len(steam_ids), STEAM_BATCH_SIZE):
-        batch = steam_ids[i:i + STEAM_BATCH_SIZE]
-        url = "https://api.steampowered.com/ISteamUser/GetPlayerSummaries/v2/"
-        params = {
-            "key": api_key,
-            "steamids": ",".join(batch),
-        }
+    stats = stats if stats is not None else FetchStats()
+    stats.steam_ids = len(steam_ids)
+    start = time.perf_counter()
+    batches = [
+        steam_ids[i:i + STEAM_BATCH_SIZE]
+        for i in range(0, len(steam_ids), STEAM_BATCH_SIZE)
+    ]
+    stats.batches = len(batches)
+
+    pool = steam_key_pool(api_key)
+    results = await asyncio.gather(
+        *(_fetch_players_batch(batch, pool, proxy, stats) for batch in batches)
+    )
+    all_players = [p for players in results for p in players]
 
-        async def _fetch_once() -> bool:
-            client = await get_http_client(proxy)
-            try:
-                resp = await client.get(url, params=params)
-                resp.raise_for_status()
-                raw = resp.json()
-                players = raw.get("response", {}).get("players", [])
-                for p in players:
-                    all_players.append({
-                        "steamid": p.get("steamid"),
-                        "personaname": p.get("personaname"),
-                        "personastate": p.get("personastate"),
-                        "gameextrainfo": p.get("gameextrainfo"),
-                        "avatar": p.get("avatar"),
-                        "avatarfull": p.get("avatarfull"),
-                        "lastlogoff": p.get("lastlogoff"),
-                        "gameid": p.get("gameid"),
-                        "communityvisibilitystate": p.get("communityvisibilitystate"),
-                    })
-                return True
-            except (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError) as e:
-                logger.warning(f"Steam API 请求失败: {e}")
-                return False
-            except Exception as e:
-                logger.error(f"Steam API 请求异常: {e}")
-                return False
-
-        ok = await _fetch_once()
-        if not ok:
-            logger.warning("Steam API 重试一次")
-            await _fetch_once()
-
-        if i + STEAM_BATCH_SIZE < len(steam_ids):
-            await asyncio.sleep(0.1)
+    stats.players = len(all_players)
+    stats.elapsed = time.perf_counter() - start
+    logger.debug(f"Steam API: {stats.summary()}")
 
     return {"response": {"players": all_players}}
 
 
+# ----------------------------
+# 请求合并
+# ----------------------------
+_profile_flight = get_flight("玩家主页")
+
+
 # ----------------------------
 # 通用 fetch
 # ----------------------------
 async def _fetch(
     url: str,
     default: bytes,
-    cache_file: Optional[Path] = None,
+    category: str,
     proxy: Optional[str] = None,
 ) -> bytes:
-    if cache_file is not None and cache_file.exists():
-        return cache_file.read_bytes()
-
-    try:
-        client = await get_http_client(proxy)
-        response = await client.get(url)
-        if response.status_code == 200:
-            if cache_file is not None:
-                cache_file.parent.mkdir(parents=True, exist_ok=True)
-                cache_file.write_bytes(response.content)
-            return response.content
-    except Exception as exc:
-        logger.error(f"Failed to fetch image: {exc}")
-
-    return default
+    """经磁盘缓存下载图片（avatar / background），失败时返回 default"""
+    content = await asset_fetcher.fetch(url, category, proxy)
+    return default if content is None else content
 
 
 # ----------------------------
 # 用户详情
 # ----------------------------
-async def get_user_data(
-    steam_id: int, cache_path: Path, proxy: Optional[str] = None
-) -> PlayerData:
-    url = f"https://steamcommunity.com/profiles/{steam_id}?l=schinese"
-    default_background = default_background_path.read_bytes()
-    default_avatar = default_avatar_path.read_bytes()
-    default_achievement_image = default_achievement_image_path.read_bytes()
-    default_header_image = default_header_image_path.read_bytes()
+@dataclass(frozen=True)
+class DefaultAssets:
+    background: bytes
+    avatar: bytes
+    achievement_image: bytes
+    header_image: bytes
+
+
+_default_assets: Optional[DefaultAssets] = None
+
+
+def get_default_assets() -> DefaultAssets:
+    """默认图片只读取一次，之后常驻内存"""
+    global _default_assets
+    if _default_assets is None:
+        _default_assets = DefaultAssets(
+            background=default_background_path.read_bytes(),
+            avatar=default_avatar_path.read_bytes(),
+            achievement_image=default_achievement_image_path.read_bytes(),
+            header_image=default_header_image_path.read_bytes(),
+        )
+    return _default_assets
+
 
-    result = {
+def _default_user_data() -> PlayerData:
+    assets = get_default_assets()
+    return {
         "description": "No information given.",
-        "background": default_background,
-        "avatar": default_avatar,
+        "background": assets.background,
+        "avatar": assets.avatar,
         "player_name": "Unknown",
         "recent_2_week_play_time": None,
         "game_data": [],
     }
 
+
+def _player_data_bytes(cached: Tuple[float, PlayerData]) -> int:
+    """背景、头像与游戏图片的大致字节数（游戏图片与 app_asset_store 共享，按解码后大小计）"""
+    data = cached[1]
+    size = len(data["background"]) + len(data["avatar"])
+    for game in data["game_data"]:
+        for image in [game["game_image"], *(a["image"] for a in game["achievements"])]:
+            if isinstance(image, bytes):
+                size += len(image)
+            else:
+                size += image.width * image.height * len(image.getbands())
+    return size
+
+
+# (写入时间 time.monotonic(), 数据)；过期后在宽限期内仍保留，用于先返回旧数据
+# 按背景、头像等图片的总大小限制内存占用
+STEAM_PROFILE_CACHE_TTL = config.steam_profile_cache_ttl
+STEAM_PROFILE_CACHE_STALE = config.steam_profile_cache_stale
+
+profile_cache: TTLCache[Tuple[str, Optional[str]], Tuple[float, PlayerData]] = TTLCache(
+    maxsize=256,
+    ttl=STEAM_PROFILE_CACHE_TTL + STEAM_PROFILE_CACHE_STALE,
+    max_bytes=config.steam_profile_cache_memory,
+    sizeof=_player_data_bytes,
+    name="玩家详情缓存",
+)
+_profile_refreshes: set = set()
+
+
+async def _refresh_user_data(
+    steam_id: int, proxy: Optional[str]
+) -> Optional[PlayerData]:
+    """
+    抓取并写入缓存，同一玩家同时只抓取一次
+    主页没能拿到最新内容时按已过期写入，下次访问会在后台再次刷新
+    """
+
+    async def refresh() -> Optional[PlayerData]:
+        data, fresh = await _get_user_data(steam_id, proxy)
+        if data is not None:
+            stored = time.monotonic()
+            if not fresh:
+                stored -= STEAM_PROFILE_CACHE_TTL + 1
+            profile_cache.set((str(steam_id), proxy), (stored, data))
+        return data
+
+    return await _profile_flight.do((str(steam_id), proxy), refresh)
+
+
+async def get_user_data(
+    steam_id: int, proxy: Optional[str] = None
+) -> PlayerData:
+    """
+    玩家详情（带缓存）
+    - 未过期的缓存直接返回
+    - 过期但在宽限期内的缓存先返回，同时在后台重新抓取
+    - 每个调用方拿到独立的副本（解码后的游戏图片只读，直接共享）
+    """
+    cached = profile_cache.get((str(steam_id), proxy))
+    if cached is not None:
+        stored, data = cached
+        if time.monotonic() - stored > STEAM_PROFILE_CACHE_TTL:
+            task = asyncio.create_task(_refresh_user_data(steam_id, proxy))
+            _profile_refreshes.add(task)
+            task.add_done_callback(_profile_refreshes.discard)
+        return _copy_user_data(data)
+
+    data = await _refresh_user_data(steam_id, proxy)
+    return _copy_user_data(data) if data is not None else _default_user_data()
+
+
+def _copy_user_data(data: PlayerData) -> PlayerData:
+    copied = dict(data)
+    copied["game_data"] = [
+        {**game, "achievements": [dict(a) for a in game["achievements"]]}
+        for game in data["game_data"]
+    ]
+    return copied
+
+
+async def _get_user_data(
+    steam_id: int, proxy: Optional[str] = None
+) -> Tuple[Optional[PlayerData], bool]:
+    """
+    以 Web API 为准，主页只补充简介、背景与最后运行时间，返回 (数据, 主页是否为最新)
+    主页获取失败时只用 API 的数据；两者都失败时返回 None，不写入缓存
+    """
+    url = f"{COMMUNITY_BASE_URL}/profiles/{steam_id}?l=schinese"
+    assets = get_default_assets()
+    result = _default_user_data()
+
     local_time = datetime.now(timezone.utc).astimezone()
     utc_offset_minutes = int(local_time.utcoffset().total_seconds())
 
-    try:
-        client = await get_http_client(proxy)
-        response = await client.get(
+    # 昵称、头像、最近游戏与成就走 Web API，与主页并发请求
+    (content, page_fresh), recent, summaries = await asyncio.gather(
+        # 主页带 ETag / Last-Modified 时用条件请求重新验证；
+        # 结果会写入 profile_cache，所以要等验证结果，并知道拿到的是否为最新
+        asset_fetcher.fetch_fresh(
             url,
+            "profile",
+            proxy,
             headers={
                 "User-Agent": "MadokaBot/SteamInfo",
                 "Accept-Language": "zh-CN,zh;q=0.9",
@@ -232,37 +342,98 @@ async def get_user_data(
                 "steamLanguage": "schinese",
                 "wants_mature_content": "1",
             },
-        )
-        response.raise_for_status()
-        html = response.text
-    except Exception as exc:
-        logger.error(f"获取用户详细数据失败: {exc}")
-        return result
-
-    player_name = re.search(r"<title>Steam 社区 :: (.*?)</title>", html)
+        ),
+        get_recent_game_stats(steam_id, proxy),
+        get_steam_users_info_cached([str(steam_id)], config.steam_api_key, proxy),
+    )
+    players = summaries["response"]["players"]
+    summary = players[0] if players else {}
+    if content is None and recent is None and not summary:
+        logger.error(f"获取用户详细数据失败: {steam_id}")
+        return None, False
+
+    if content is None:
+        logger.warning(f"获取用户主页失败，只使用 Web API 数据: {steam_id}")
+        page = ProfilePage()
+    else:
+        # 解析放到线程里，避免大页面阻塞事件循环
+        page = await asyncio.to_thread(parse_profile, content)
+    player_name = summary.get("personaname") or page.player_name
     if player_name:
-        result["player_name"] = player_name.group(1)
-
-    description = re.search(
-        r'<div class="profile_summary">(.*?)</div>', html, re.DOTALL
+        result["player_name"] = player_name
+    if page.description:
+        result["description"] = page.description
+    result["recent_2_week_play_time"] = page.recent_playtime
+
+    avatar_url = summary.get("avatarfull") or page.avatar_url
+    background, avatar = await asyncio.gather(
+        _fetch(page.background_url, assets.background, "background", proxy)
+        if page.background_url
+        else asyncio.sleep(0, assets.background),
+        _fetch(avatar_url, assets.avatar, "avatar", proxy)
+        if avatar_url
+        else asyncio.sleep(0, assets.avatar),
     )
-    if description:
-        desc = description.group(1)
-        desc = re.sub(r"<br>", "\n", desc)
-        desc = re.sub(r"\t", "", desc)
-        desc = re.sub(r"ː.*?ː", "", desc)
-        desc = re.sub(r"<.*?>", "", desc)
-        result["description"] = desc.strip()
-
-    soup = BeautifulSoup(html, "html.parser")
-    game_data = []
-
-    for game in soup.find_all("div", class_="recent_game"):
-        game_info = {
-            "game_name": game.find("div", class_="game_name").text.strip(),
+    result["background"], result["avatar"] = background, avatar
+
+    if recent is None:
+        # Web API 不可用（未公开或请求失败）时回退到主页里的最近游戏
+        result["game_data"] = await _page_game_data(page, proxy)
+    else:
+        result["game_data"] = await _api_game_data(recent, page, proxy)
+        if recent and not result["recent_2_week_play_time"]:
+            minutes = sum(game.playtime_2weeks for game in recent)
+            result["recent_2_week_play_time"] = f"{minutes / 60:.1f} 小时（过去 2 周）"
+    return result, page_fresh
+
+
+async def _page_game_data(page: ProfilePage, proxy: Optional[str]) -> List[GameData]:
+    headers = await asyncio.gather(
+        *(app_asset_store.header(game.app_id, game.image_url, proxy) for game in page.games)
+    )
+    return [
+        {
+            "game_name": game.name,
+            "game_image": header,
+            "play_time": game.play_time or "0",
+            "last_played": game.last_played or "未知",
             "achievements": [],
+            "completed_achievement_number": game.completed_achievements,
+            "total_achievement_number": game.total_achievements,
+        }
+        for game, header in zip(page.games, headers)
+    ]
+
+
+async def _api_game_data(
+    recent: List[RecentGameStats], page: ProfilePage, proxy: Optional[str]
+) -> List[GameData]:
+    # Web API 不提供最后运行时间，按 appid 从主页取
+    page_games = {game.app_id: game for game in page.games if game.app_id}
+
+    async def build(game: RecentGameStats) -> GameData:
+        header, *icons = await asyncio.gather(
+            app_asset_store.header(game.app_id, game.header_url, proxy),
+            *(
+                app_asset_store.achievement(game.app_id, achievement.icon_url, proxy)
+                for achievement in game.achievements
+            ),
+        )
+        page_game = page_games.get(game.app_id)
+        completed, total = game.completed_achievements, game.total_achievements
+        if completed is None and page_game is not None:
+            completed, total = page_game.completed_achievements, page_game.total_achievements
+        return {
+            "game_name": game.name,
+            "game_image": header,
+            "play_time": f"{game.playtime_forever / 60:.1f}",
+            "last_played": page_game.last_played if page_game and page_game.last_played else "未知",
+            "achievements": [
+                {"name": achievement.name, "image": icon}
+                for achievement, icon in zip(game.achievements, icons)
+            ],
+            "completed_achievement_number": completed or 0,
+            "total_achievement_number": total or 0,
         }
-        game_data.append(game_info)
 
-    result["game_data"] = game_data
-    return result
+    return list(await asyncio.gather(*(build(game) for game in recent)))
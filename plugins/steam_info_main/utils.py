@@ -1,68 +1,50 @@
+from __future__ import annotations
+
 import time
 import pytz
-import httpx
 import datetime
 import calendar
-from PIL import Image
 from io import BytesIO
 from pathlib import Path
 from typing import Dict, Optional
 from nonebot import logger
 
-
+from ..madoka_bundle.lazy import lazy_import
 from .models import Player
 from .constants import *
 from .data_source import BindData
-from .steam import get_http_client
+from .avatars import AvatarStore, _avatar_flight, download_avatar
 
-import time
+Image = lazy_import("PIL.Image")
 
 
 
 async def fetch_avatar(
-    player: Player, avatar_dir: Optional[Path], proxy: str = None
+    player: Player,
+    store: Optional[AvatarStore],
+    proxy: str = None,
+    size: Optional[int] = None,
 ) -> Image.Image:
+    """size 为 AVATAR_VARIANTS 中的尺寸时直接返回预先缩放好的头像"""
+    if store is not None:
+        return await store.get(player, proxy, size)
+
     # 使用 .get() 并在缺失时尝试 fallback 到 "avatar" 字段
     url = player.get("avatarfull") or player.get("avatar")
-    
     if not url:
         logger.warning(f"玩家 {player.get('steamid')} 缺少头像 URL")
         return Image.open(unknown_avatar_path)
+    return await _fetch_avatar(url, proxy)
 
-    if avatar_dir is None:
-        return await _fetch_avatar(url, proxy)
-
-    avatar_dir.mkdir(parents=True, exist_ok=True)
-    avatar_path = avatar_dir / f"avatar_{player['steamid']}.png"
-
-    if avatar_path.exists():
-        mtime = avatar_path.stat().st_mtime
-        if (time.time() - mtime) < 86400:
-            try:
-                return Image.open(avatar_path)
-            except Exception:
-                avatar_path.unlink(missing_ok=True)
-
-    avatar = await _fetch_avatar(url, proxy)
-    try:
-        avatar.save(avatar_path)
-    except Exception as e:
-        logger.error(f"保存头像失败: {e}")
-            
-    return avatar
 
 async def _fetch_avatar(avatar_url: str, proxy: str = None) -> Image.Image:
-    client = get_http_client(proxy) # 使用全局复用的单例
-    try:
-        response = await client.get(avatar_url)
-        if response.status_code == 200:
-            return Image.open(BytesIO(response.content))
-        else:
-            logger.warning(f"下载头像失败，状态码: {response.status_code}")
-    except Exception as e:
-        logger.warning(f"下载头像异常: {avatar_url}, 错误: {e}")
-            
-    return Image.open(unknown_avatar_path)
+    # 同一头像的并发请求只下载一次
+    content = await _avatar_flight.do(
+        (avatar_url, proxy), lambda: download_avatar(avatar_url, proxy)
+    )
+    if content is None:
+        return Image.open(unknown_avatar_path)
+    return Image.open(BytesIO(content))
 
 
 def convert_player_name_to_nickname(
@@ -73,9 +55,9 @@ def convert_player_name_to_nickname(
 
 
 async def simplize_steam_player_data(
-    player: Player, proxy: str = None, avatar_dir: Path = None
+    player: Player, proxy: str = None, store: Optional[AvatarStore] = None
 ) -> Dict[str, str]:
-    avatar = await fetch_avatar(player, avatar_dir, proxy)
+    avatar = await fetch_avatar(player, store, proxy, size=50)
 
     if player["personastate"] == 0:
         if not player.get("lastlogoff"):
@@ -0,0 +1,267 @@
+"""
+Steam Web API
+- 所有接口共用 Key 池、令牌桶与并发上限，失败时按退避重试，主机熔断时直接放弃
+- 最近游戏与成就直接取自 IPlayerService / ISteamUserStats，不再依赖主页 HTML
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import httpx
+from nonebot.log import logger
+
+from ..madoka_bundle.cache import TTLCache
+from .client import http_clients
+from .config import config
+from .keys import SteamKeyPool, get_key_pool, mask_key
+from .polling import RequestBudget
+from .ratelimit import TokenBucket
+from .resilience import CircuitOpenError, backoff_delay, get_breaker, guarded_get
+from .singleflight import get_flight
+
+API_BASE_URL = config.steam_api_base_url.rstrip("/")
+CDN_BASE_URL = config.steam_cdn_base_url.rstrip("/")
+
+RECENT_GAMES_LIMIT = 3  # 与主页一致，只取最近 3 个游戏
+ACHIEVEMENT_ICON_LIMIT = 6  # 绘图最多 6 格，超过时第 6 格显示 +N
+
+api_bucket = TokenBucket(config.steam_api_rate_limit, config.steam_api_burst)
+api_semaphore = asyncio.Semaphore(max(config.steam_api_concurrency, 1))
+# 每分钟请求预算，每次实际发出请求时扣除，轮询据此决定取多少玩家
+api_budget = RequestBudget(config.steam_poll_budget)
+# 逐游戏请求（成就 + 成就表）同时最多处理的游戏数，所有玩家共用
+_game_workers = asyncio.Semaphore(max(config.steam_api_workers, 1))
+
+
+@dataclass
+class FetchStats:
+    """一次 get_steam_users_info 调用的统计"""
+    steam_ids: int = 0  # 实际请求的 ID 数
+    cached: int = 0  # 由缓存直接返回的 ID 数
+    batches: int = 0
+    players: int = 0
+    retries: int = 0
+    failures: int = 0
+    waited: float = 0.0  # 等待令牌的总时长
+    elapsed: float = 0.0
+    batch_times: List[float] = field(default_factory=list)  # 每批耗时，含重试
+
+    def summary(self) -> str:
+        slowest = max(self.batch_times, default=0.0)
+        return (
+            f"{self.steam_ids} 个 ID / {self.batches} 批（缓存命中 {self.cached}），返回 {self.players} 人，"
+            f"重试 {self.retries} 次，失败 {self.failures} 批，"
+            f"限速等待 {self.waited:.2f}s，最慢单批 {slowest:.2f}s，总耗时 {self.elapsed:.2f}s"
+        )
+
+
+def steam_key_pool(api_key: Union[str, List[str], None] = None) -> SteamKeyPool:
+    return get_key_pool(
+        config.steam_api_key if api_key is None else api_key,
+        config.steam_api_key_strategy,
+        config.steam_api_daily_limit,
+        config.steam_api_key_quarantine,
+    )
+
+
+def _is_api_answer(response: httpx.Response) -> bool:
+    """
+    接口本身给出的 4xx（资料未公开、游戏没有成就等）带 JSON 正文；
+    Key 无效或被限流时返回的是 HTML 页面
+    """
+    if "json" not in response.headers.get("content-type", ""):
+        return False
+    try:
+        response.json()
+    except ValueError:
+        return False
+    return True
+
+
+async def api_get(
+    path: str,
+    params: Dict[str, Any],
+    proxy: Optional[str] = None,
+    pool: Optional[SteamKeyPool] = None,
+    stats: Optional[FetchStats] = None,
+) -> Optional[dict]:
+    """
+    调用 Web API，返回解析后的 JSON
+    - 403 / 429 视为 Key 被拒，隔离后换 Key 重试
+    - 接口明确表示没有数据（带 JSON 的 400 / 403）时直接返回 None，不重试
+    """
+    url = f"{API_BASE_URL}/{path.lstrip('/')}"
+    breaker = get_breaker(url)
+    pool = pool or steam_key_pool()
+    stats = stats or FetchStats()
+    for attempt in range(config.steam_api_retries + 1):
+        if attempt:
+            stats.retries += 1
+            await asyncio.sleep(backoff_delay(attempt - 1))
+        key = pool.acquire()
+        if key is None:
+            logger.warning("没有可用的 Steam API Key（均被限流或已达每日上限）")
+            break
+        async with api_semaphore:
+            stats.waited += await api_bucket.acquire()
+            api_budget.charge()
+            client = http_clients.get(proxy)
+            try:
+                resp = await guarded_get(client, url, breaker, params={"key": key, **params})
+                if resp.status_code in (400, 403) and _is_api_answer(resp):
+                    pool.report_success(key)
+                    logger.debug(f"Steam API {path} 无数据（{resp.status_code}）: {params}")
+                    return None
+                if resp.status_code in (403, 429):
+                    pool.report_status(key, resp.status_code)
+                    logger.warning(f"Steam API Key {mask_key(key)} 被拒绝（{resp.status_code}），已暂时隔离")
+                    continue
+                resp.raise_for_status()
+                pool.report_success(key)
+                return resp.json()
+            except CircuitOpenError as e:
+                # 熔断期间不再重试，直接失败
+                logger.warning(f"Steam API {e}")
+                break
+            except (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError) as e:
+                logger.warning(f"Steam API {path} 请求失败（第 {attempt + 1} 次）: {e}")
+            except Exception as e:
+                logger.error(f"Steam API {path} 请求异常（第 {attempt + 1} 次）: {e}")
+    return None
+
+
+# ----------------------------
+# 成就表（按 appid 缓存）
+# ----------------------------
+# apiname -> (显示名称, 图标 URL)
+Schema = Dict[str, Tuple[str, str]]
+
+schema_cache: TTLCache[str, Schema] = TTLCache(
+    maxsize=1024,
+    ttl=config.steam_schema_cache_ttl,
+    name="成就表缓存",
+)
+_schema_flight = get_flight("成就表")
+
+
+async def get_game_schema(app_id: str, proxy: Optional[str] = None) -> Optional[Schema]:
+    """游戏的成就表，所有玩家共用；没有成就的游戏缓存为空表，请求失败不缓存"""
+
+    async def load() -> Optional[Schema]:
+        data = await api_get(
+            "ISteamUserStats/GetSchemaForGame/v2/",
+            {"appid": app_id, "l": "schinese"},
+            proxy,
+        )
+        if data is None:
+            return None
+        achievements = (
+            data.get("game", {}).get("availableGameStats", {}).get("achievements", [])
+        )
+        schema = {
+            item["name"]: (item.get("displayName") or item["name"], item.get("icon") or "")
+            for item in achievements
+            if item.get("name")
+        }
+        schema_cache.set(app_id, schema)
+        return schema
+
+    cached = schema_cache.get(app_id)
+    if cached is not None:
+        return cached
+    return await _schema_flight.do(app_id, load)
+
+
+# ----------------------------
+# 最近游戏
+# ----------------------------
+@dataclass
+class RecentAchievement:
+    name: str
+    icon_url: str
+
+
+@dataclass
+class RecentGameStats:
+    app_id: str
+    name: str
+    playtime_2weeks: int = 0  # 分钟
+    playtime_forever: int = 0  # 分钟
+    completed_achievements: Optional[int] = None  # None 表示没有成就数据
+    total_achievements: Optional[int] = None
+    achievements: List[RecentAchievement] = field(default_factory=list)  # 最近解锁的在前
+
+    @property
+    def header_url(self) -> str:
+        return f"{CDN_BASE_URL}/steam/apps/{self.app_id}/header.jpg"
+
+
+async def _load_achievements(
+    steam_id: str, game: RecentGameStats, proxy: Optional[str]
+) -> None:
+    async with _game_workers:
+        unlocked, schema = await asyncio.gather(
+            api_get(
+                "ISteamUserStats/GetPlayerAchievements/v1/",
+                {"steamid": steam_id, "appid": game.app_id},
+                proxy,
+            ),
+            get_game_schema(game.app_id, proxy),
+        )
+    if unlocked is None:
+        return
+    achievements = unlocked.get("playerstats", {}).get("achievements") or []
+    if not achievements:
+        return
+    achieved = sorted(
+        (item for item in achievements if item.get("achieved")),
+        key=lambda item: item.get("unlocktime", 0),
+        reverse=True,
+    )
+    game.completed_achievements = len(achieved)
+    game.total_achievements = len(achievements)
+    if not schema:
+        return
+    # 超过 6 个时只画 5 个，留一格给 +N
+    limit = ACHIEVEMENT_ICON_LIMIT if len(achieved) <= ACHIEVEMENT_ICON_LIMIT else ACHIEVEMENT_ICON_LIMIT - 1
+    for item in achieved:
+        if len(game.achievements) >= limit:
+            break
+        name, icon = schema.get(item["apiname"], (item["apiname"], ""))
+        if icon:
+            game.achievements.append(RecentAchievement(name, icon))
+
+
+async def get_recent_game_stats(
+    steam_id: Union[str, int], proxy: Optional[str] = None
+) -> Optional[List[RecentGameStats]]:
+    """
+    最近两周玩过的游戏及成就
+    资料未公开或请求失败时返回 None，由调用方回退到主页解析
+    各游戏的成就请求并发进行，同时处理的游戏数受 steam_api_workers 限制
+    """
+    steam_id = str(steam_id)
+    data = await api_get(
+        "IPlayerService/GetRecentlyPlayedGames/v1/",
+        {"steamid": steam_id, "count": RECENT_GAMES_LIMIT},
+        proxy,
+    )
+    if data is None:
+        return None
+    response = data.get("response", {})
+    if "total_count" not in response:
+        return None  # 游戏详情未公开时 response 为空
+
+    games = [
+        RecentGameStats(
+            app_id=str(item["appid"]),
+            name=item.get("name") or str(item["appid"]),
+            playtime_2weeks=item.get("playtime_2weeks", 0),
+            playtime_forever=item.get("playtime_forever", 0),
+        )
+        for item in response.get("games", [])[:RECENT_GAMES_LIMIT]
+        if item.get("appid")
+    ]
+    await asyncio.gather(*(_load_achievements(steam_id, game, proxy) for game in games))
+    return games
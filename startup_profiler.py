@@ -0,0 +1,172 @@
+"""
+启动耗时分析
+
+设置环境变量 MADOKA_PROFILE_STARTUP=1 后启用，记录：
+- 每个插件的导入耗时
+- 每个模块的导入耗时（含子模块 / 仅自身）
+- 每个 on_startup 钩子的执行耗时
+全部启动钩子执行完毕后输出排序后的报告。未启用时所有函数均为空操作。
+"""
+
+import os
+import sys
+import time
+import asyncio
+import functools
+from importlib.abc import MetaPathFinder
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ENV_NAME = "MADOKA_PROFILE_STARTUP"
+REPORT_LIMIT = 15
+
+enabled = os.getenv(ENV_NAME, "").lower() in ("1", "true", "yes", "on")
+
+_started_at = time.perf_counter()
+_module_times: Dict[str, Tuple[float, float]] = {}  # 模块名 -> (含子模块耗时, 自身耗时)
+_hook_times: List[Tuple[str, float]] = []
+_stack: List[float] = []  # 正在导入的模块中，子模块已累计的耗时
+_register_startup: Optional[Callable] = None  # 未被包装的 driver.on_startup
+
+
+class _ImportTimer(MetaPathFinder):
+    """包装其他查找器返回的 loader，统计 exec_module 耗时"""
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # 内置 / 冻结模块的 loader 是类本身，不做包装
+            if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                if not getattr(loader, "_madoka_timed", False):
+                    loader.exec_module = _timed_exec(fullname, loader.exec_module)
+                    loader._madoka_timed = True
+            return spec
+        return None
+
+
+def _timed_exec(name: str, exec_module: Callable[[Any], None]) -> Callable[[Any], None]:
+    @functools.wraps(exec_module)
+    def wrapper(module):
+        start = time.perf_counter()
+        _stack.append(0.0)
+        try:
+            exec_module(module)
+        finally:
+            children = _stack.pop()
+            total = time.perf_counter() - start
+            if _stack:
+                _stack[-1] += total
+            _module_times[name] = (total, total - children)
+    return wrapper
+
+
+_timer = _ImportTimer()
+
+
+def install() -> None:
+    """安装导入计时器，应尽早调用"""
+    if not enabled:
+        return
+    pin()
+
+
+def pin() -> None:
+    """确保计时器位于 sys.meta_path 首位（nonebot 会插入自己的插件查找器）"""
+    if not enabled:
+        return
+    if _timer in sys.meta_path:
+        sys.meta_path.remove(_timer)
+    sys.meta_path.insert(0, _timer)
+
+
+def _hook_name(func: Callable) -> str:
+    return f"{getattr(func, '__module__', '?')}.{getattr(func, '__qualname__', repr(func))}"
+
+
+def _timed_hook(func: Callable) -> Callable:
+    name = _hook_name(func)
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper():
+            start = time.perf_counter()
+            try:
+                return await func()
+            finally:
+                _hook_times.append((name, time.perf_counter() - start))
+        return async_wrapper
+
+    @functools.wraps(func)
+    def sync_wrapper():
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            _hook_times.append((name, time.perf_counter() - start))
+    return sync_wrapper
+
+
+def watch_driver(driver) -> None:
+    """之后通过 driver.on_startup 注册的钩子都会被计时"""
+    global _register_startup
+    if not enabled:
+        return
+    pin()
+    _register_startup = register = driver.on_startup
+
+    def on_startup(func):
+        register(_timed_hook(func))
+        return func
+
+    driver.on_startup = on_startup
+
+
+def schedule_report(driver) -> None:
+    """注册为最后一个启动钩子，启动完成后输出报告"""
+    if not enabled:
+        return
+    (_register_startup or driver.on_startup)(report)
+
+
+def _format(rows: List[Tuple[str, float]], limit: int = REPORT_LIMIT) -> List[str]:
+    rows = sorted(rows, key=lambda x: x[1], reverse=True)[:limit]
+    return [f"  {seconds * 1000:9.1f} ms  {name}" for name, seconds in rows]
+
+
+async def report() -> None:
+    from nonebot import get_loaded_plugins
+    from nonebot.log import logger
+
+    total = time.perf_counter() - _started_at
+    lines = [f"启动耗时报告（自计时器安装起共 {total:.2f}s）"]
+
+    plugin_rows = [
+        (plugin.id_, _module_times[plugin.module_name][0])
+        for plugin in get_loaded_plugins()
+        if plugin.module_name in _module_times
+    ]
+    lines.append("[插件导入（含子模块）]")
+    lines.extend(_format(plugin_rows, limit=len(plugin_rows)))
+
+    # 按顶层包聚合自身耗时，找出重量级依赖
+    packages: Dict[str, float] = {}
+    for name, (_, own) in _module_times.items():
+        top = name.partition(".")[0]
+        packages[top] = packages.get(top, 0.0) + own
+    lines.append("[顶层包导入（仅自身耗时合计）]")
+    lines.extend(_format(list(packages.items())))
+
+    lines.append("[单个模块导入（含子模块）]")
+    lines.extend(_format([(name, t[0]) for name, t in _module_times.items()]))
+
+    lines.append("[on_startup 钩子]")
+    lines.extend(_format(_hook_times, limit=len(_hook_times)))
+
+    logger.opt(colors=False).info("\n".join(lines))
+
+
+install()
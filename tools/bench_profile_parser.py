@@ -0,0 +1,130 @@
+"""
+对比 Steam 个人主页的两种解析方式
+- legacy: 原先 get_user_data 中的正则 + BeautifulSoup(html.parser)
+- stream: plugins/steam_info_main/profile_parser.py
+
+用法:
+    python tools/bench_profile_parser.py [--size 300] [--rounds 50] [页面.html ...]
+
+不指定页面时使用 tools/fixtures/ 下的示例页面，并用评论区块填充到 --size KB，
+模拟真实主页中最近游戏之后的大段内容。
+"""
+
+import argparse
+import html as html_lib
+import importlib.util
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+FILLER_MARK = "<!-- FILLER -->"
+FILLER_BLOCK = """
+<div class="commentthread_comment responsive_body_text">
+    <div class="commentthread_comment_avatar playerAvatar offline">
+        <a href="https://steamcommunity.com/id/someone"><img src="https://avatars.cloudflare.steamstatic.com/0000000000000000000000000000000000000000.jpg"></a>
+    </div>
+    <div class="commentthread_comment_content">
+        <div class="commentthread_comment_author">
+            <a class="hoverunderline commentthread_author_link" href="https://steamcommunity.com/id/someone"><bdi>某位好友</bdi></a>
+            <span class="commentthread_comment_timestamp" title="2024 年 10 月 2 日 下午 8:00">2024 年 10 月 2 日 下午 8:00</span>
+        </div>
+        <div class="commentthread_comment_text">+rep 一起玩很开心 ːsteamhappyː</div>
+    </div>
+</div>
+"""
+
+
+def load_parser():
+    path = ROOT / "plugins" / "steam_info_main" / "profile_parser.py"
+    spec = importlib.util.spec_from_file_location("profile_parser", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_parse(html: str) -> dict:
+    import bs4
+
+    result = {"player_name": None, "description": None, "games": []}
+    player_name = re.search(r"<title>Steam 社区 :: (.*?)</title>", html)
+    if player_name:
+        result["player_name"] = player_name.group(1)
+    description = re.search(r'<div class="profile_summary">(.*?)</div>', html, re.DOTALL)
+    if description:
+        desc = description.group(1)
+        desc = re.sub(r"<br>", "\n", desc)
+        desc = re.sub(r"\t", "", desc)
+        desc = re.sub(r"ː.*?ː", "", desc)
+        desc = re.sub(r"<.*?>", "", desc)
+        result["description"] = desc.strip()
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    for game in soup.find_all("div", class_="recent_game"):
+        result["games"].append(game.find("div", class_="game_name").text.strip())
+    return result
+
+
+def build_page(path: Path, size_kb: int) -> str:
+    html = path.read_text("utf-8")
+    if FILLER_MARK in html and size_kb * 1024 > len(html.encode("utf-8")):
+        missing = size_kb * 1024 - len(html.encode("utf-8"))
+        copies = missing // len(FILLER_BLOCK.encode("utf-8")) + 1
+        html = html.replace(FILLER_MARK, FILLER_BLOCK * copies)
+    return html
+
+
+def bench(fn, html: str, rounds: int):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(html)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pages", nargs="*", type=Path)
+    parser.add_argument("--size", type=int, default=300, help="示例页面填充后的大小（KB）")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    profile_parser = load_parser()
+    pages = args.pages or sorted(FIXTURES.glob("*.html"))
+    try:
+        import bs4  # noqa: F401
+        has_bs4 = True
+    except ImportError:
+        has_bs4 = False
+        print("未安装 beautifulsoup4，只测试 stream 解析")
+
+    for path in pages:
+        html = build_page(path, args.size)
+        print(f"{path.name}: {len(html.encode('utf-8')) / 1024:.0f}KB")
+
+        page = profile_parser.parse_profile(html)
+        print(f"  玩家 {page.player_name!r}，最近游戏 {[g.name for g in page.games]}")
+        print(f"  近两周 {page.recent_playtime!r}，头像 {page.avatar_url is not None}，背景 {page.background_url is not None}")
+
+        mean, p95 = bench(profile_parser.parse_profile, html, args.rounds)
+        print(f"  stream  平均 {mean:7.2f}ms  p95 {p95:7.2f}ms")
+        if has_bs4:
+            legacy = legacy_parse(html)
+            # 旧实现不会反转义 HTML 实体
+            same = (
+                html_lib.unescape(legacy["player_name"] or "") == (page.player_name or "")
+                and html_lib.unescape(legacy["description"] or "") == (page.description or "")
+                and legacy["games"] == [g.name for g in page.games]
+            )
+            legacy_mean, legacy_p95 = bench(legacy_parse, html, args.rounds)
+            print(f"  legacy  平均 {legacy_mean:7.2f}ms  p95 {legacy_p95:7.2f}ms")
+            print(f"  加速 {legacy_mean / mean:.1f}x，结果{'一致' if same else '不一致'}")
+
+
+if __name__ == "__main__":
+    main()
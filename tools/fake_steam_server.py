@@ -0,0 +1,304 @@
+"""
+本地 Steam 替身服务器，用于离线测试 steam_info_main
+
+提供:
+- /ISteamUser/GetPlayerSummaries/v2/   按 steamid 生成稳定的玩家摘要，游戏状态随时间轮换
+- /IPlayerService/GetRecentlyPlayedGames/v1/  最近游戏（取自 GAMES，时长按 steamid 固定）
+- /ISteamUserStats/GetPlayerAchievements/v1/ 与 /ISteamUserStats/GetSchemaForGame/v2/  成就
+- /profiles/{steamid}                   基于 tools/fixtures/steam_profile.html 的个人主页
+- /avatars/{hash}_full.jpg 等           生成的头像
+- /static/...、/steam/apps/{appid}/...  生成的游戏头图、背景、成就图标等图片（支持 ETag / 304）
+- /_control                             GET 查看、POST 修改故障注入参数
+
+故障注入:
+- --latency / --jitter      每个请求额外延迟（毫秒）
+- --error-rate              按比例返回 500
+- --rate-limit              每个 key 每秒最多请求数，超过返回 429
+
+用法:
+    python tools/fake_steam_server.py --port 8765 --latency 200 --error-rate 0.1
+
+然后在 .env 中把插件指向它:
+    STEAM_API_BASE_URL=http://127.0.0.1:8765
+    STEAM_COMMUNITY_BASE_URL=http://127.0.0.1:8765
+    STEAM_CDN_BASE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Deque, Dict, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from PIL import Image, ImageDraw
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+ASSET_URL_PATTERN = re.compile(r"https://[\w.]*steamstatic\.com/")
+AVATAR_URL_PATTERN = re.compile(r"https://avatars\.[\w.]*steamstatic\.com/[0-9a-f]+_full\.jpg")
+GAMES = [
+    ("570", "Dota 2"),
+    ("730", "Counter-Strike 2"),
+    ("1245620", "ELDEN RING"),
+    ("413150", "Stardew Valley"),
+    ("1086940", "Baldur's Gate 3"),
+]
+ACHIEVEMENT_COUNT = 40  # 每个游戏的成就数，413150 视为没有成就
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0  # 毫秒
+    jitter: float = 0.0  # 毫秒
+    error_rate: float = 0.0  # 0 ~ 1
+    rate_limit: float = 0.0  # 每个 key 每秒请求数，0 表示不限制
+    status_period: int = 120  # 玩家游戏状态轮换周期（秒）
+
+
+@dataclass
+class Counters:
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    not_modified: int = 0
+
+
+def _seed(steamid: str) -> int:
+    return int(hashlib.sha1(steamid.encode()).hexdigest()[:8], 16)
+
+
+def _avatar_hash(steamid: str) -> str:
+    return hashlib.sha1(f"avatar-{steamid}".encode()).hexdigest()
+
+
+def _image(size: Tuple[int, int], seed: int, fmt: str = "JPEG") -> bytes:
+    rng = random.Random(seed)
+    color = tuple(rng.randrange(40, 220) for _ in range(3))
+    image = Image.new("RGB", size, color)
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        r = rng.randrange(4, max(5, min(size) // 3))
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def create_app(faults: Faults) -> FastAPI:
+    app = FastAPI(title="Fake Steam")
+    counters = Counters()
+    windows: Dict[str, Deque[float]] = defaultdict(deque)
+    images: Dict[str, bytes] = {}
+    profile_template = (FIXTURES / "steam_profile.html").read_text("utf-8")
+
+    def base_url(request: Request) -> str:
+        return str(request.base_url).rstrip("/")
+
+    def player(steamid: str, base: str) -> dict:
+        seed = _seed(steamid)
+        period = max(1, faults.status_period)
+        slot = int(time.time() // period) + seed
+        avatar_hash = _avatar_hash(steamid)
+        data = {
+            "steamid": steamid,
+            "communityvisibilitystate": 3,
+            "profilestate": 1,
+            "personaname": f"Player{steamid[-4:]}",
+            "profileurl": f"{base}/profiles/{steamid}/",
+            "avatar": f"{base}/avatars/{avatar_hash}.jpg",
+            "avatarmedium": f"{base}/avatars/{avatar_hash}_medium.jpg",
+            "avatarfull": f"{base}/avatars/{avatar_hash}_full.jpg",
+            "avatarhash": avatar_hash,
+            "lastlogoff": int(time.time()) - seed % 86400,
+            "personastate": slot % 4,
+            "personastateflags": 0,
+            "timecreated": 1300000000 + seed % 300000000,
+        }
+        # 约一半的时间在玩游戏，每个周期可能换游戏
+        if data["personastate"] and slot % 2:
+            app_id, name = GAMES[slot % len(GAMES)]
+            data["gameid"] = app_id
+            data["gameextrainfo"] = name
+        return data
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path.startswith("/_control"):
+            return await call_next(request)
+        counters.requests += 1
+        if faults.latency or faults.jitter:
+            delay = faults.latency + random.uniform(0, faults.jitter)
+            await asyncio.sleep(delay / 1000)
+        if faults.rate_limit > 0:
+            key = request.query_params.get("key") or request.client.host
+            window = windows[key]
+            now = time.monotonic()
+            while window and now - window[0] > 1.0:
+                window.popleft()
+            if len(window) >= faults.rate_limit:
+                counters.throttled += 1
+                return Response(status_code=429)
+            window.append(now)
+        if faults.error_rate and random.random() < faults.error_rate:
+            counters.errors += 1
+            return Response(status_code=500)
+        return await call_next(request)
+
+    @app.get("/_control")
+    async def get_control():
+        return {"faults": asdict(faults), "counters": asdict(counters)}
+
+    @app.post("/_control")
+    async def set_control(request: Request):
+        for key, value in (await request.json()).items():
+            if hasattr(faults, key):
+                setattr(faults, key, type(getattr(faults, key))(value))
+        return {"faults": asdict(faults)}
+
+    @app.get("/ISteamUser/GetPlayerSummaries/v2/")
+    async def player_summaries(request: Request, key: str = "", steamids: str = ""):
+        if not key:
+            return Response(status_code=403)
+        ids = [i for i in steamids.split(",") if i.isdigit()][:100]
+        base = base_url(request)
+        return JSONResponse({"response": {"players": [player(i, base) for i in ids]}})
+
+    def recent_games(steamid: str) -> list:
+        seed = _seed(steamid)
+        games = []
+        for i in range(seed % 4):  # 0 ~ 3 个最近游戏
+            app_id, name = GAMES[(seed + i) % len(GAMES)]
+            games.append({
+                "appid": int(app_id),
+                "name": name,
+                "playtime_2weeks": (seed >> i) % 1200 + 10,
+                "playtime_forever": (seed >> i) % 60000 + 1200,
+                "img_icon_url": hashlib.sha1(app_id.encode()).hexdigest(),
+            })
+        return games
+
+    @app.get("/IPlayerService/GetRecentlyPlayedGames/v1/")
+    async def recently_played(key: str = "", steamid: str = "", count: int = 0):
+        if not key:
+            return Response(status_code=403)
+        games = recent_games(steamid)
+        if count:
+            games = games[:count]
+        return JSONResponse({"response": {"total_count": len(games), "games": games}})
+
+    @app.get("/ISteamUserStats/GetSchemaForGame/v2/")
+    async def schema_for_game(request: Request, key: str = "", appid: str = ""):
+        if not key:
+            return Response(status_code=403)
+        name = dict(GAMES).get(appid, appid)
+        if appid == "413150":
+            return JSONResponse({"game": {"gameName": name}})
+        base = base_url(request)
+        achievements = [
+            {
+                "name": f"ACH_{i}",
+                "displayName": f"{name} 成就 {i}",
+                "icon": f"{base}/static/achievements/{appid}/{i}.jpg",
+                "icongray": f"{base}/static/achievements/{appid}/{i}_gray.jpg",
+            }
+            for i in range(ACHIEVEMENT_COUNT)
+        ]
+        return JSONResponse({"game": {"gameName": name, "availableGameStats": {"achievements": achievements}}})
+
+    @app.get("/ISteamUserStats/GetPlayerAchievements/v1/")
+    async def player_achievements(key: str = "", steamid: str = "", appid: str = ""):
+        if not key:
+            return Response(status_code=403)
+        if appid == "413150":
+            return JSONResponse(
+                {"playerstats": {"error": "Requested app has no stats", "success": False}},
+                status_code=400,
+            )
+        seed = _seed(f"{steamid}-{appid}")
+        unlocked = seed % (ACHIEVEMENT_COUNT + 1)
+        achievements = [
+            {
+                "apiname": f"ACH_{i}",
+                "achieved": int(i < unlocked),
+                "unlocktime": 1600000000 + (seed >> 3) % 10000000 + i * 3600 if i < unlocked else 0,
+            }
+            for i in range(ACHIEVEMENT_COUNT)
+        ]
+        return JSONResponse({"playerstats": {"steamID": steamid, "achievements": achievements, "success": True}})
+
+    @app.get("/profiles/{steamid}")
+    async def profile(request: Request, steamid: str):
+        base = base_url(request)
+        name = f"Player{steamid[-4:]}"
+        html = AVATAR_URL_PATTERN.sub(
+            f"{base}/avatars/{_avatar_hash(steamid)}_full.jpg", profile_template
+        )
+        html = ASSET_URL_PATTERN.sub(f"{base}/static/", html)
+        html = html.replace("Madoka &amp; Friends", name)
+        html = html.replace("https://steamcommunity.com", base)
+        return Response(html, media_type="text/html; charset=utf-8")
+
+    def serve_image(request: Request, name: str, size: Tuple[int, int]) -> Response:
+        content = images.get(name)
+        if content is None:
+            content = images[name] = _image(size, _seed(name))
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            counters.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content, media_type="image/jpeg", headers={"ETag": etag})
+
+    @app.get("/avatars/{name}")
+    async def avatar(request: Request, name: str):
+        size = (64, 64) if "_medium" in name else (32, 32) if "_" not in name else (184, 184)
+        return serve_image(request, name, size)
+
+    @app.get("/steam/apps/{app_id}/{name}")
+    async def app_asset(request: Request, app_id: str, name: str):
+        return serve_image(request, f"apps/{app_id}/{name}", (460, 215))
+
+    @app.get("/static/{path:path}")
+    async def static(request: Request, path: str):
+        if "capsule" in path or "header" in path:
+            size = (184, 69)
+        elif "background" in path:
+            size = (960, 540)
+        else:
+            size = (64, 64)
+        return serve_image(request, path, size)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Steam 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟上限（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="每个 key 每秒请求上限")
+    parser.add_argument("--status-period", type=int, default=120, help="游戏状态轮换周期（秒）")
+    args = parser.parse_args()
+
+    faults = Faults(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        status_period=args.status_period,
+    )
+    uvicorn.run(create_app(faults), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()